@@ -0,0 +1,106 @@
+"""
+Batch runner: match many patient requests without prompts.
+
+    python batch.py requests.jsonl -o results.jsonl --concurrency 4
+
+Input is JSONL or CSV with the fields symptom, age, sex, insurance,
+member_prefix and zip (location / postal_code / member_id / gender are
+accepted too). Each ranked result is appended to the output JSONL as soon
+as its request finishes.
+"""
+import argparse, asyncio, csv, json, os, time
+from main import build_graph, report_cache_stats, run_search
+from review_fetcher import close_http_client
+from parse_pool import shutdown_parse_pool
+from utils.utils import cleanup_temp_data
+
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+
+
+# =========================================================
+# Input
+# =========================================================
+def load_requests(path: str) -> list:
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            return [dict(row) for row in csv.DictReader(f)]
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def to_state(req: dict) -> dict:
+    """Map one request row onto the graph's input state."""
+    age = req.get("age")
+    try:
+        age = int(age) if age not in (None, "") else None
+    except ValueError:
+        age = None
+    postal = str(req.get("zip") or req.get("postal_code") or "").strip()
+    return {
+        "symptom": (req.get("symptom") or "").strip(),
+        "specialty": req.get("specialty") or None,
+        "age": age,
+        "gender": req.get("sex") or req.get("gender"),
+        "insurance": req.get("insurance") or "",
+        "member_id": req.get("member_prefix") or req.get("member_id"),
+        "postal_code": postal,
+        "location": req.get("location") or postal,
+    }
+
+
+# =========================================================
+# Runner
+# =========================================================
+async def run_batch(in_path: str, out_path: str, concurrency: int = BATCH_CONCURRENCY):
+    requests = load_requests(in_path)
+    app = build_graph(interactive=False)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    print(f"📦 Running {len(requests)} requests (concurrency {concurrency})...")
+
+    async def run_one(idx: int, req: dict) -> dict:
+        async with semaphore:
+            started = time.perf_counter()
+            record = {"index": idx, "request": req}
+            try:
+                state = await run_search(app, to_state(req))
+                record["specialty"] = state.get("specialty")
+                record["ranked"] = state.get("ranked") or []
+                record["partial"] = bool(state.get("partial"))
+            except Exception as e:
+                print(f"❌ Request {idx} failed: {e}")
+                record["error"] = str(e)
+            record["elapsed_s"] = round(time.perf_counter() - started, 2)
+            return record
+
+    started = time.perf_counter()
+    done = failed = 0
+    tasks = [asyncio.create_task(run_one(i, req)) for i, req in enumerate(requests)]
+    with open(out_path, "w", encoding="utf-8") as out:
+        for next_done in asyncio.as_completed(tasks):
+            record = await next_done
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            done += 1
+            failed += "error" in record
+
+    elapsed = time.perf_counter() - started
+    print(f"\n📊 {done} requests ({failed} failed) in {elapsed:.1f}s "
+          f"— {done / elapsed if elapsed else 0:.2f} req/s → {out_path}")
+    # Searches share the temp files, so they are removed once the whole batch is done
+    cleanup_temp_data()
+    report_cache_stats()
+    await close_http_client()
+    shutdown_parse_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run provider matching for a file of patient requests.")
+    parser.add_argument("input", help="JSONL or CSV file of requests")
+    parser.add_argument("-o", "--output", default="results.jsonl", help="JSONL file for ranked results")
+    parser.add_argument("-c", "--concurrency", type=int, default=BATCH_CONCURRENCY,
+                        help="requests processed at the same time")
+    args = parser.parse_args()
+    asyncio.run(run_batch(args.input, args.output, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
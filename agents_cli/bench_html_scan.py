@@ -0,0 +1,68 @@
+"""
+Micro-benchmark: BeautifulSoup JSON-LD + get_text path vs html_scan.scan_html.
+
+    python bench_html_scan.py                 # synthetic ~200k-char review page
+    python bench_html_scan.py doctor_pages/*.html
+
+The BeautifulSoup path is what test.py used to do per page: one full parse
+for fetch_jsonld_rating and a second one for extract_relevant_chunks.
+"""
+import json, sys, timeit
+from bs4 import BeautifulSoup
+from html_scan import scan_html
+
+REPEAT = 5
+
+
+def soup_path(html: str):
+    soup = BeautifulSoup(html, "html.parser")
+    rating = None
+    for tag in soup.find_all("script", {"type": "application/ld+json"}):
+        try:
+            data = json.loads(tag.text)
+            if isinstance(data, dict) and "aggregateRating" in data:
+                rating = data["aggregateRating"]
+                break
+        except Exception:
+            continue
+    text = BeautifulSoup(html, "html.parser").get_text(" ", strip=True)
+    return rating, text
+
+
+def synthetic_page(chars: int = 200000) -> str:
+    jsonld = {
+        "@context": "https://schema.org",
+        "@graph": [{"@type": "Physician", "name": "Dr. Example",
+                    "aggregateRating": {"ratingValue": "4.7", "reviewCount": "132"}}],
+    }
+    review = (
+        "<div class='review'><span class='stars'>5 stars</span>"
+        "<p>Dr. Example was thorough and kind. Would recommend to anyone.</p>"
+        "<script>track('review-view');</script></div>"
+    )
+    body = review * (chars // len(review) + 1)
+    return (
+        f"<html><head><title>Dr. Example</title><style>.x{{color:red}}</style>"
+        f"<script type='application/ld+json'>{json.dumps(jsonld)}</script></head>"
+        f"<body>{body}</body></html>"
+    )
+
+
+def main():
+    if len(sys.argv) > 1:
+        pages = []
+        for path in sys.argv[1:]:
+            with open(path, encoding="utf-8", errors="ignore") as f:
+                pages.append(f.read())
+    else:
+        pages = [synthetic_page()]
+
+    total = sum(len(p) for p in pages)
+    print(f"📄 {len(pages)} page(s), {total:,} chars total, best of {REPEAT}")
+    for label, fn in (("BeautifulSoup x2", soup_path), ("scan_html", scan_html)):
+        best = min(timeit.repeat(lambda: [fn(p) for p in pages], number=1, repeat=REPEAT))
+        print(f"  {label:<18} {best * 1000:8.1f} ms  ({best * 1000 / len(pages):.1f} ms/page)")
+
+
+if __name__ == "__main__":
+    main()
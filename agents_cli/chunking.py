@@ -0,0 +1,113 @@
+import math, os, re
+from collections import Counter
+from functools import lru_cache
+from html_scan import scan_html
+
+# =========================================================
+# Setup
+# =========================================================
+REVIEW_TOKEN_BUDGET = int(os.getenv("REVIEW_TOKEN_BUDGET", "600"))
+WINDOW_WORDS = 40
+WINDOW_STRIDE = 20
+BM25_K1, BM25_B = 1.2, 0.75
+
+NUMBER_TERM = "#num"
+# Rating / review vocabulary the windows are scored against
+QUERY_TERMS = {
+    "star", "stars", "rating", "ratings", "rated", "review", "reviews", "reviewed",
+    "patient", "patients", "based", "average", "overall", "score", "recommend",
+    "recommended", "satisfaction", "feedback", "experience", NUMBER_TERM,
+}
+WORD_RE = re.compile(r"\S+")
+NUMBER_RE = re.compile(r"^\(?\d+(?:[.,]\d+)?\)?[%/]?$")
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        print(f"⚠️ tiktoken unavailable, estimating tokens from length: {e}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    enc = _encoding()
+    return len(enc.encode(text)) if enc else max(1, len(text) // 4)
+
+
+def html_to_text(html: str) -> str:
+    return scan_html(html)["text"]
+
+
+# =========================================================
+# Window scoring + budgeted packing
+# =========================================================
+def _term(word: str) -> str:
+    if NUMBER_RE.match(word):
+        return NUMBER_TERM
+    return word.strip(".,:;!?()[]\"'").lower()
+
+
+def select_chunks(text: str, token_budget: int = REVIEW_TOKEN_BUDGET) -> str:
+    """Pick the best rating/review windows of `text` that fit in `token_budget` tokens.
+
+    One pass tokenizes the text; overlapping word windows are scored with BM25
+    against QUERY_TERMS and packed greedily (best first, no overlaps), then
+    joined in document order.
+    """
+    words = [(m.start(), m.end(), _term(m.group(0))) for m in WORD_RE.finditer(text)]
+    if not words:
+        return ""
+
+    starts = range(0, max(1, len(words) - WINDOW_WORDS + WINDOW_STRIDE), WINDOW_STRIDE)
+    windows = []
+    for start in starts:
+        end = min(start + WINDOW_WORDS, len(words))
+        counts = Counter(t for _, _, t in words[start:end] if t in QUERY_TERMS)
+        windows.append((start, end, counts))
+
+    # BM25 with each window as a document
+    df = Counter(t for _, _, counts in windows for t in counts)
+    n_docs = len(windows)
+    avg_len = sum(end - start for start, end, _ in windows) / n_docs
+    scored = []
+    for start, end, counts in windows:
+        length = end - start
+        score = 0.0
+        for term, tf in counts.items():
+            idf = math.log(1 + (n_docs - df[term] + 0.5) / (df[term] + 0.5))
+            score += idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_len))
+        # A window needs vocabulary, not just numbers
+        if score > 0 and any(t != NUMBER_TERM for t in counts):
+            scored.append((score, start, end))
+
+    if not scored:
+        return _truncate_to_budget(text, token_budget)
+
+    chosen, used = [], 0
+    for score, start, end in sorted(scored, key=lambda x: (-x[0], x[1])):
+        if any(start < c_end and c_start < end for c_start, c_end in chosen):
+            continue
+        chunk = text[words[start][0]:words[end - 1][1]]
+        cost = count_tokens(chunk) + 2  # separator
+        if used + cost > token_budget:
+            continue
+        chosen.append((start, end))
+        used += cost
+
+    chosen.sort()
+    return " ... ".join(text[words[start][0]:words[end - 1][1]] for start, end in chosen)
+
+
+def _truncate_to_budget(text: str, token_budget: int) -> str:
+    enc = _encoding()
+    if enc:
+        return enc.decode(enc.encode(text)[:token_budget])
+    return text[: token_budget * 4]
+
+
+def extract_relevant_chunks(html: str, token_budget: int = REVIEW_TOKEN_BUDGET) -> str:
+    """Visible text of a review page reduced to its most rating-relevant windows."""
+    return select_chunks(html_to_text(html), token_budget)
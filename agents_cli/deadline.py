@@ -0,0 +1,62 @@
+import asyncio, inspect, math, os, time
+from typing import Optional
+
+# =========================================================
+# Setup
+# =========================================================
+SEARCH_BUDGET = float(os.getenv("SEARCH_BUDGET", "90"))  # seconds per search, end to end
+RANK_RESERVE = 2.0  # seconds kept back for ranking and the final event
+
+
+def new_deadline(budget: float = SEARCH_BUDGET) -> float:
+    """Absolute deadline as a wall-clock timestamp (plain float, so it lives in graph state)."""
+    return time.time() + budget
+
+
+def remaining(deadline: Optional[float]) -> float:
+    """Seconds left before `deadline` (inf when there is none)."""
+    if deadline is None:
+        return math.inf
+    return max(0.0, deadline - time.time())
+
+
+def expired(deadline: Optional[float]) -> bool:
+    return remaining(deadline) <= 0
+
+
+def sub_deadline(deadline: Optional[float], share: float = 1.0, reserve: float = 0.0,
+                 cap: Optional[float] = None) -> Optional[float]:
+    """Deadline for a sub-call allowed `share` of the time left after `reserve`, at most `cap` seconds."""
+    if deadline is None:
+        return time.time() + cap if cap else None
+    budget = max(0.0, remaining(deadline) - reserve) * share
+    if cap:
+        budget = min(budget, cap)
+    return time.time() + budget
+
+
+async def run_until(coro, deadline: Optional[float]):
+    """Await `coro`, cancelling it at `deadline` (raises asyncio.TimeoutError)."""
+    left = remaining(deadline)
+    if left == math.inf:
+        return await coro
+    return await asyncio.wait_for(coro, timeout=left)
+
+
+async def iterate_until(source, deadline: Optional[float]):
+    """Yield items from a list, an awaitable list or an async iterator until `deadline`.
+
+    Async iterators are consumed item by item, so callers can act on each
+    item while the source is still producing. Raises asyncio.TimeoutError.
+    """
+    if hasattr(source, "__aiter__"):
+        items = source.__aiter__()
+        while True:
+            try:
+                item = await run_until(items.__anext__(), deadline)
+            except StopAsyncIteration:
+                return
+            yield item
+    else:
+        for item in (await run_until(source, deadline) if inspect.isawaitable(source) else source):
+            yield item
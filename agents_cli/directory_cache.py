@@ -0,0 +1,198 @@
+import asyncio, inspect, json, os, re, sqlite3, threading, time
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+# =========================================================
+# Setup
+# =========================================================
+DIRECTORY_CACHE = os.getenv("DIRECTORY_CACHE", "1") != "0"
+DIRECTORY_CACHE_PATH = os.getenv("DIRECTORY_CACHE_PATH", "directory_cache.sqlite3")
+DIRECTORY_CACHE_TTL = float(os.getenv("DIRECTORY_CACHE_TTL", str(6 * 3600)))      # seconds served as fresh
+DIRECTORY_CACHE_STALE = float(os.getenv("DIRECTORY_CACHE_STALE", str(24 * 3600)))  # then served while refreshing
+
+
+def directory_key(prefix: str, postal_code: str, specialty: str, radius: int = 25) -> str:
+    """('ZGP', '77840 ', 'Cardiology', 25) → 'zgp|77840|cardiology|25'."""
+    def norm(text):
+        return re.sub(r"\s+", " ", str(text or "").lower()).strip()
+    return f"{norm(prefix)}|{norm(postal_code)}|{norm(specialty)}|{radius}"
+
+
+class DirectoryCache:
+    """Provider lists by directory search key, in SQLite so batch runs and later searches share them.
+
+    get() returns entries up to TTL + STALE old, marked fresh or not; callers
+    serve stale ones and call revalidate(). single_flight() makes concurrent
+    misses for one key share a single scrape. Async callers use aget()/aput(),
+    which run SQLite in a worker thread.
+    """
+
+    def __init__(self, path: str = DIRECTORY_CACHE_PATH, ttl: float = DIRECTORY_CACHE_TTL,
+                 stale: float = DIRECTORY_CACHE_STALE):
+        self.ttl = ttl
+        self.stale = stale
+        self.counts = {"fresh": 0, "stale": 0, "misses": 0, "refreshes": 0, "joined": 0}
+        self._inflight = {}  # key → Task shared by everyone waiting on that scrape
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS directory_results ("
+                " key TEXT PRIMARY KEY, providers TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    def get(self, key: str) -> Optional[tuple]:
+        """(providers, fresh) for `key`, or None if missing or too old to serve."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT providers, updated_at FROM directory_results WHERE key = ?", (key,)
+            ).fetchone()
+        age = time.time() - row[1] if row else None
+        if row is None or age > self.ttl + self.stale:
+            self.counts["misses"] += 1
+            return None
+        fresh = age <= self.ttl
+        self.counts["fresh" if fresh else "stale"] += 1
+        return json.loads(row[0]), fresh
+
+    def put(self, key: str, providers: list):
+        """Cache `providers` under `key`. Empty lists are skipped: they mostly mean a failed or timed-out scrape."""
+        if not providers:
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO directory_results (key, providers, updated_at) VALUES (?, ?, ?)",
+                (key, json.dumps(providers, default=str), time.time()),
+            )
+
+    # The async methods run SQLite in a worker thread so a busy cache never blocks the event loop
+    async def aget(self, key: str) -> Optional[tuple]:
+        return await asyncio.to_thread(self.get, key)
+
+    async def aput(self, key: str, providers: list):
+        if providers:
+            await asyncio.to_thread(self.put, key, providers)
+
+    def _start(self, key: str, load: Callable[[], Awaitable]) -> asyncio.Task:
+        task = self._inflight[key] = asyncio.ensure_future(load())
+
+        def done(t):
+            self._inflight.pop(key, None)
+            if not t.cancelled() and t.exception() is not None:
+                print(f"⚠️ Directory load failed for {key}: {t.exception()}")
+
+        task.add_done_callback(done)
+        return task
+
+    async def single_flight(self, key: str, load: Callable[[], Awaitable]):
+        """Await `load()`, or the call already running for `key`."""
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._start(key, load)
+        else:
+            self.counts["joined"] += 1
+        # Shield: one caller giving up must not cancel the scrape for the others
+        return await asyncio.shield(task)
+
+    def revalidate(self, key: str, load: Callable[[], Awaitable]):
+        """Refresh `key` in the background (at most one load per key at a time)."""
+        if key not in self._inflight:
+            self.counts["refreshes"] += 1
+            self._start(key, load)
+
+    def claim(self, key: str):
+        """Mark `key` as being loaded by the caller, who must call release()."""
+        self._inflight[key] = asyncio.get_running_loop().create_future()
+
+    async def release(self, key: str, providers: Optional[list]):
+        """End a claim: wake the waiters and cache `providers` (None = the load didn't finish).
+
+        An empty list is treated like a failed load, so waiters go and load for themselves.
+        """
+        flight = self._inflight.pop(key, None)
+        if flight is not None and not flight.done():
+            flight.set_result(providers or None)
+        await self.aput(key, providers)
+
+    async def wait(self, key: str) -> Optional[list]:
+        """Result of the load running for `key` (None if there is none or it failed)."""
+        flight = self._inflight.get(key)
+        if flight is None:
+            return None
+        self.counts["joined"] += 1
+        try:
+            return await asyncio.shield(flight)
+        except Exception:
+            return None
+
+    def stats(self) -> dict:
+        return dict(self.counts)
+
+
+_cache: Optional[DirectoryCache] = None
+
+
+def get_directory_cache() -> Optional[DirectoryCache]:
+    """Shared cache, or None when DIRECTORY_CACHE=0."""
+    global _cache
+    if DIRECTORY_CACHE and _cache is None:
+        _cache = DirectoryCache()
+    return _cache
+
+
+# =========================================================
+# Provider sources
+# =========================================================
+async def _iterate(source):
+    """Items of a list, an awaitable list or an async iterator."""
+    if hasattr(source, "__aiter__"):
+        async for p in source:
+            yield p
+    else:
+        for p in (await source if inspect.isawaitable(source) else source):
+            yield p
+
+
+async def _load_and_put(cache: DirectoryCache, key: str, load_source) -> list:
+    providers = [dict(p) async for p in _iterate(load_source())]
+    await cache.aput(key, providers)
+    return providers
+
+
+async def cached_providers(key: str, load_source: Callable[[], object]) -> AsyncIterator[dict]:
+    """Providers for a directory search: from the cache when possible, else live.
+
+    `load_source()` returns what find_providers iterates (a list, an awaitable list
+    or an async iterator). A live source is still streamed card by card; once it
+    is read to the end the list is cached, and identical searches started
+    meanwhile wait for it instead of scraping again.
+    """
+    cache = get_directory_cache()
+    if cache is None:
+        async for p in _iterate(load_source()):
+            yield p
+        return
+
+    hit = await cache.aget(key)
+    if hit is None:
+        providers = await cache.wait(key)
+        hit = (providers, True) if providers is not None else None
+    if hit is not None:
+        providers, fresh = hit
+        if not fresh:
+            cache.revalidate(key, lambda: _load_and_put(cache, key, load_source))
+        print(f"⚡ {len(providers)} providers from the directory cache ({'fresh' if fresh else 'stale'})")
+        for p in providers:
+            yield dict(p)
+        return
+
+    # Miss: stream the live source, publishing the full list to anyone who asks meanwhile
+    cache.claim(key)
+    collected, complete = [], False
+    try:
+        async for p in _iterate(load_source()):
+            collected.append(dict(p))
+            yield p
+        complete = True
+    finally:
+        await cache.release(key, collected if complete else None)
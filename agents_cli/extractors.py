@@ -0,0 +1,158 @@
+import os, re
+from typing import Callable, Optional
+from html_scan import find_aggregate_rating, scan_html
+
+# =========================================================
+# Setup
+# =========================================================
+EXTRACTOR_CONFIDENCE = float(os.getenv("EXTRACTOR_CONFIDENCE", "0.8"))
+MAX_REVIEW_COUNT = 100000
+
+# domain → extractors; "*" runs for every site
+EXTRACTORS: dict = {}
+
+
+def register(*domains: str):
+    """Register an extractor `fn(html, scan) -> {"rating", "reviews", "confidence"} | None`.
+
+    `scan` is the html_scan.scan_html result for the same page (parsed JSON-LD, visible text).
+    """
+    def wrap(fn: Callable):
+        for domain in domains:
+            EXTRACTORS.setdefault(domain, []).append(fn)
+        return fn
+    return wrap
+
+
+def domain_of(site: str) -> str:
+    """'https://www.healthgrades.com/physician/x' or 'healthgrades.com/physician' → 'healthgrades.com'."""
+    host = re.sub(r"^https?://", "", site).split("/")[0].lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def _to_float(value) -> Optional[float]:
+    try:
+        return float(str(value).replace(",", "").strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def _result(rating, reviews, confidence: float) -> Optional[dict]:
+    rating, reviews = _to_float(rating), _to_float(reviews)
+    if rating is None or not 0 < rating <= 5:
+        return None
+    if reviews is None or not 0 <= reviews <= MAX_REVIEW_COUNT:
+        # A rating without a count is still useful, but less certain
+        reviews, confidence = 0, confidence * 0.7
+    return {"rating": round(rating, 2), "reviews": int(reviews), "confidence": round(confidence, 2)}
+
+
+# =========================================================
+# Generic extractors (structured data)
+# =========================================================
+@register("*")
+def jsonld_extractor(html: str, scan: dict) -> Optional[dict]:
+    # Blocks were already parsed by the single-pass scan; no second pass over the markup
+    for block in scan["jsonld"]:
+        agg = find_aggregate_rating(block)
+        if agg:
+            count = agg.get("reviewCount", agg.get("ratingCount"))
+            result = _result(agg.get("ratingValue"), count, 0.95)
+            if result:
+                return result
+    return None
+
+
+MICRODATA_RATING_RE = re.compile(
+    r"itemprop=[\"']ratingValue[\"'][^>]*?(?:content=[\"']([\d.]+)[\"'][^>]*>|>\s*([\d.]+)\s*<)", re.I
+)
+MICRODATA_COUNT_RE = re.compile(
+    r"itemprop=[\"'](?:reviewCount|ratingCount)[\"'][^>]*?(?:content=[\"']([\d,]+)[\"'][^>]*>|>\s*([\d,]+)\s*<)", re.I
+)
+
+
+@register("*")
+def microdata_extractor(html: str, scan: dict) -> Optional[dict]:
+    rating = MICRODATA_RATING_RE.search(html)
+    if not rating:
+        return None
+    count = MICRODATA_COUNT_RE.search(html)
+    return _result(
+        rating.group(1) or rating.group(2),
+        (count.group(1) or count.group(2)) if count else None,
+        0.9,
+    )
+
+
+# =========================================================
+# Site-specific extractors (page state / visible text)
+# =========================================================
+# Text patterns only ever see the visible text, and are anchored so dates ("3/5/2024"),
+# paths ("/img/2/5.png") and years ("2023") can't pass for a rating. They stay below
+# EXTRACTOR_CONFIDENCE: a text hit is a hint, only structured data skips the LLM.
+TEXT_CONFIDENCE = 0.6
+OUT_OF_FIVE_RE = re.compile(r"(?<![\d/.])(\d(?:\.\d{1,2})?)\s*(?:out of|/)\s*5(?:\.0)?(?![\d/]|\.\d)(?:\s*stars?)?", re.I)
+COUNT_RE = re.compile(r"(?<![\d/.])(\d[\d,]*)\s*(?:patient\s+)?(?:ratings?|reviews?)\b", re.I)
+
+
+def _text_pattern(text: str, rating_re, count_re, confidence: float = TEXT_CONFIDENCE) -> Optional[dict]:
+    rating = rating_re.search(text)
+    if not rating:
+        return None
+    count = count_re.search(text)
+    return _result(rating.group(1), count.group(1) if count else None, confidence)
+
+
+@register("healthgrades.com")
+def healthgrades_extractor(html: str, scan: dict) -> Optional[dict]:
+    # Embedded page state: "overallRating":4.6 ... "totalRatings":123
+    state_rating = re.search(r"\"(?:overallRating|averageRating)\"\s*:\s*\"?(\d(?:\.\d+)?)(?![\d.])", html)
+    state_count = re.search(r"\"(?:totalRatings|ratingCount|reviewCount)\"\s*:\s*\"?(\d+)", html)
+    if state_rating:
+        return _result(state_rating.group(1), state_count.group(1) if state_count else None, 0.9)
+    return _text_pattern(scan["text"], OUT_OF_FIVE_RE, COUNT_RE)
+
+
+@register("vitals.com")
+def vitals_extractor(html: str, scan: dict) -> Optional[dict]:
+    state_rating = re.search(r"\"(?:ratingValue|overall_rating|averageRating)\"\s*:\s*\"?(\d(?:\.\d+)?)(?![\d.])", html)
+    state_count = re.search(r"\"(?:reviewCount|ratingCount|review_count|totalReviews)\"\s*:\s*\"?(\d+)", html)
+    if state_rating:
+        return _result(state_rating.group(1), state_count.group(1) if state_count else None, 0.9)
+    return _text_pattern(scan["text"], OUT_OF_FIVE_RE, COUNT_RE)
+
+
+RATEMDS_RATING_RE = re.compile(
+    r"(?:Rating|rated)\s*:?\s*(?<![\d/.])(\d(?:\.\d{1,2})?)(?![\d/]|\.\d)\s*(?:/\s*5(?![\d/]|\.\d)|out of 5|stars?)?", re.I
+)
+
+
+@register("ratemds.com")
+def ratemds_extractor(html: str, scan: dict) -> Optional[dict]:
+    result = _text_pattern(scan["text"], OUT_OF_FIVE_RE, COUNT_RE)
+    return result or _text_pattern(scan["text"], RATEMDS_RATING_RE, COUNT_RE, TEXT_CONFIDENCE - 0.05)
+
+
+# =========================================================
+# Entry point
+# =========================================================
+def extract_rating(site: str, html: str, scan: Optional[dict] = None,
+                   min_confidence: float = EXTRACTOR_CONFIDENCE) -> Optional[dict]:
+    """Best deterministic {"rating", "reviews", "confidence", "source"} for a page, if confident.
+
+    Pass the page's scan_html result when the caller already has it.
+    """
+    if scan is None:
+        scan = scan_html(html)
+    best = None
+    for fn in EXTRACTORS.get(domain_of(site), []) + EXTRACTORS.get("*", []):
+        try:
+            result = fn(html, scan)
+        except Exception as e:
+            print(f"⚠️ Extractor {fn.__name__} failed for {site}: {e}")
+            continue
+        if result and (best is None or result["confidence"] > best["confidence"]):
+            best = {**result, "source": fn.__name__}
+    if best and best["confidence"] >= min_confidence:
+        return best
+    return None
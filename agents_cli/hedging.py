@@ -0,0 +1,136 @@
+import asyncio, os, time
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+# =========================================================
+# Setup
+# =========================================================
+HEDGING = os.getenv("HEDGING", "0") == "1"                       # opt-in
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))    # hedge after this latency percentile
+HEDGE_MAX_EXTRA = float(os.getenv("HEDGE_MAX_EXTRA", "0.05"))    # hedges / requests cap
+HEDGE_MIN_SAMPLES = 20   # no hedging until the percentile means something
+HEDGE_WINDOW = 500       # rolling latency samples
+HEDGE_MIN_DELAY = 0.05   # seconds
+
+
+class Hedger:
+    """Issue a duplicate call when the first is slower than the rolling percentile.
+
+    Whichever finishes first (successfully) wins; the other is cancelled.
+    """
+
+    def __init__(self, name: str, percentile: float = HEDGE_PERCENTILE, max_extra: float = HEDGE_MAX_EXTRA):
+        self.name = name
+        self.percentile = percentile
+        self.max_extra = max_extra
+        self.latencies = deque(maxlen=HEDGE_WINDOW)
+        self.counts = {"requests": 0, "hedged": 0, "hedge_wins": 0, "over_budget": 0, "no_slot": 0}
+
+    def delay(self) -> Optional[float]:
+        if len(self.latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        idx = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+        return max(HEDGE_MIN_DELAY, ordered[idx])
+
+    async def _timed(self, call: Callable[[], Awaitable]):
+        started = time.monotonic()
+        result = await call()
+        self.latencies.append(time.monotonic() - started)
+        return result
+
+    async def _hedge(self, call: Callable[[], Awaitable], slots, n: int):
+        try:
+            return await self._timed(call)
+        finally:
+            if slots is not None:
+                await slots.release(n)
+
+    async def run(self, call: Callable[[], Awaitable], slots=None, n: int = 1):
+        """Await `call()`, hedged when enabled. `call` must be safe to issue twice.
+
+        With `slots` (try_acquire(n) / async release(n)), the duplicate takes n
+        slots of that limit while it runs, and is skipped when they aren't free.
+        """
+        if not HEDGING:
+            return await call()
+        self.counts["requests"] += 1
+        delay = self.delay()
+        primary = asyncio.ensure_future(self._timed(call))
+        tasks = [primary]
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done:
+                    if self.counts["hedged"] >= self.max_extra * self.counts["requests"]:
+                        self.counts["over_budget"] += 1
+                    elif slots is not None and not slots.try_acquire(n):
+                        self.counts["no_slot"] += 1
+                    else:
+                        self.counts["hedged"] += 1
+                        tasks.append(asyncio.ensure_future(self._hedge(call, slots, n)))
+
+            pending, error = set(tasks), None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=lambda t: t is not primary):
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.counts["hedge_wins"] += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    task.exception()  # mark retrieved
+
+    def stats(self) -> dict:
+        delay = self.delay()
+        return {**self.counts, "delay_s": round(delay, 3) if delay is not None else None}
+
+
+_hedgers: dict = {}
+
+
+def get_hedger(name: str) -> Hedger:
+    if name not in _hedgers:
+        _hedgers[name] = Hedger(name)
+    return _hedgers[name]
+
+
+def stats() -> dict:
+    return {name: h.stats() for name, h in _hedgers.items()}
+
+
+# Limit the LLM hedges count against (set by llm_gateway); None = hedges are unlimited
+_llm_slots: Optional[Callable[[], object]] = None
+
+
+def share_llm_slots(get_slots: Callable[[], object]):
+    """Make LLM hedges take their slots from `get_slots()` (or be skipped when it's full)."""
+    global _llm_slots
+    _llm_slots = get_slots
+
+
+# =========================================================
+# LLM client wrapper (sits under the cache so hits don't skew the percentile)
+# =========================================================
+class HedgedLLM:
+    """Hedges ainvoke/abatch of a LangChain chat model; everything else is forwarded."""
+
+    def __init__(self, llm):
+        self.llm = llm
+
+    async def ainvoke(self, prompt, *args, **kwargs):
+        return await get_hedger("llm").run(lambda: self.llm.ainvoke(prompt, *args, **kwargs),
+                                           _llm_slots() if _llm_slots else None)
+
+    async def abatch(self, prompts, *args, **kwargs):
+        return await get_hedger("llm_batch").run(lambda: self.llm.abatch(prompts, *args, **kwargs),
+                                                 _llm_slots() if _llm_slots else None, len(prompts))
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
@@ -0,0 +1,93 @@
+import json
+from html.parser import HTMLParser
+from typing import Optional
+
+# Tags whose contents are never visible text
+SKIP_TAGS = {"script", "style", "noscript", "template", "svg"}
+
+
+def find_aggregate_rating(data) -> Optional[dict]:
+    """Depth-first search for aggregateRating, including nested @graph arrays."""
+    if isinstance(data, list):
+        for item in data:
+            found = find_aggregate_rating(item)
+            if found:
+                return found
+    elif isinstance(data, dict):
+        agg = data.get("aggregateRating")
+        if isinstance(agg, dict):
+            return agg
+        for value in data.values():
+            if isinstance(value, (dict, list)):
+                found = find_aggregate_rating(value)
+                if found:
+                    return found
+    return None
+
+
+class _Scanner(HTMLParser):
+    """Tokenizer callbacks only — collects JSON-LD blocks and visible text, builds no tree."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.jsonld_blocks = []
+        self.text_parts = []
+        self._jsonld_buf = None
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "script" and any(k == "type" and (v or "").strip().lower() == "application/ld+json" for k, v in attrs):
+            self._jsonld_buf = []
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag == "script" and self._jsonld_buf is not None:
+            self.jsonld_blocks.append("".join(self._jsonld_buf))
+            self._jsonld_buf = None
+        if tag in SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_data(self, data):
+        if self._jsonld_buf is not None:
+            self._jsonld_buf.append(data)
+        elif not self._skip_depth:
+            data = data.strip()
+            if data:
+                self.text_parts.append(data)
+
+
+def scan_html(html: str) -> dict:
+    """One pass over `html` → {"jsonld": [...], "aggregate_rating": {...} | None, "text": str}.
+
+    `text` matches BeautifulSoup's get_text(" ", strip=True) minus script/style
+    content; `aggregate_rating` is {"rating", "reviews"} from the first JSON-LD
+    block that has one.
+    """
+    scanner = _Scanner()
+    try:
+        scanner.feed(html)
+        scanner.close()
+    except Exception as e:
+        # Keep whatever was collected before malformed markup
+        print(f"⚠️ HTML scan stopped early: {e}")
+
+    blocks, aggregate = [], None
+    for raw in scanner.jsonld_blocks:
+        try:
+            data = json.loads(raw)
+        except json.JSONDecodeError:
+            continue
+        blocks.append(data)
+        if aggregate is None:
+            agg = find_aggregate_rating(data)
+            if agg:
+                try:
+                    rating = float(agg.get("ratingValue", 0.0) or 0.0)
+                    reviews = int(float(agg.get("reviewCount", agg.get("ratingCount", 0)) or 0))
+                except (TypeError, ValueError):
+                    continue
+                if rating or reviews:
+                    aggregate = {"rating": rating, "reviews": reviews}
+
+    return {"jsonld": blocks, "aggregate_rating": aggregate, "text": " ".join(scanner.text_parts)}
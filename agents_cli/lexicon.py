@@ -0,0 +1,113 @@
+import difflib, json, os, re
+from typing import Optional
+
+# =========================================================
+# Setup
+# =========================================================
+SYNONYMS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "specialty_synonyms.json")
+FUZZY_CUTOFF = 0.88
+
+
+def normalize_term(text: str) -> str:
+    """Lowercase, drop punctuation and trailing plural 's' so 'Chest pains' == 'chest pain'."""
+    words = re.sub(r"[^a-z0-9&/ ]+", " ", text.lower()).split()
+    return " ".join(w[:-1] if len(w) > 3 and w.endswith("s") and not w.endswith("ss") else w for w in words)
+
+
+# =========================================================
+# Lexicon
+# =========================================================
+class SpecialtyLexicon:
+    """Alias + symptom index used to resolve user input without an LLM call."""
+
+    def __init__(self):
+        self.aliases = {}       # normalized alias → canonical specialty
+        self.symptoms = {}      # normalized symptom phrase → canonical specialty
+        self.pediatric = {}     # adult specialty → pediatric counterpart
+        self.hits = self.misses = 0
+
+    def add_specialty(self, name: str, aliases=()):
+        for alias in (name, *aliases):
+            key = normalize_term(alias)
+            if key:
+                self.aliases.setdefault(key, name)
+
+    def add_symptom(self, phrase: str, specialty: str):
+        key = normalize_term(phrase)
+        if key:
+            self.symptoms[key] = specialty
+
+    def lookup_specialty(self, text: str) -> Optional[str]:
+        key = normalize_term(text)
+        if key in self.aliases:
+            return self.aliases[key]
+        close = difflib.get_close_matches(key, self.aliases.keys(), n=1, cutoff=FUZZY_CUTOFF)
+        return self.aliases[close[0]] if close else None
+
+    def lookup_symptom(self, text: str) -> Optional[str]:
+        key = f" {normalize_term(text)} "
+        # Longest phrase wins so "chest pain" beats "pain"-style generic entries
+        for phrase in sorted(self.symptoms, key=len, reverse=True):
+            if f" {phrase} " in key:
+                return self.symptoms[phrase]
+        return None
+
+    def resolve(self, text: str, is_pediatric: bool = False) -> Optional[str]:
+        """Return the specialty for a specialty name or known symptom, else None."""
+        specialty = self.lookup_specialty(text)
+        if not specialty:
+            specialty = self.lookup_symptom(text)
+            if specialty and is_pediatric:
+                specialty = self.pediatric.get(specialty, specialty)
+        if specialty:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return specialty
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+# =========================================================
+# Seeding
+# =========================================================
+def load_db_specialties() -> list:
+    """Specialty names from the web backend's providers.Specialty table.
+
+    Only used when DJANGO_SETTINGS_MODULE is set and web_backend is importable.
+    """
+    if not os.getenv("DJANGO_SETTINGS_MODULE"):
+        return []
+    try:
+        import django
+        django.setup()
+        from providers.models import Specialty
+        return list(Specialty.objects.values_list("name", flat=True))
+    except Exception as e:
+        print(f"⚠️ Could not load specialties from database: {e}")
+        return []
+
+
+def build_lexicon(path: str = SYNONYMS_PATH) -> SpecialtyLexicon:
+    lexicon = SpecialtyLexicon()
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"⚠️ Could not read specialty synonyms from {path}: {e}")
+        data = {}
+
+    for name, aliases in data.get("specialties", {}).items():
+        lexicon.add_specialty(name, aliases)
+    for name in load_db_specialties():
+        lexicon.add_specialty(name)
+    for phrase, specialty in data.get("symptoms", {}).items():
+        lexicon.add_symptom(phrase, specialty)
+    lexicon.pediatric = dict(data.get("pediatric", {}))
+    return lexicon
@@ -0,0 +1,168 @@
+import asyncio, hashlib, json, os, re, sqlite3, threading, time
+from typing import Optional
+from langchain_core.messages import AIMessage
+
+# =========================================================
+# Setup
+# =========================================================
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite3")
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))  # seconds
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+
+
+def normalize_prompt(prompt) -> str:
+    """Collapse whitespace so re-indented prompts share one cache entry."""
+    if not isinstance(prompt, str):
+        # List of messages / prompt value: key on role + content
+        messages = prompt.to_messages() if hasattr(prompt, "to_messages") else prompt
+        prompt = json.dumps(
+            [[getattr(m, "type", ""), getattr(m, "content", str(m))] for m in messages],
+            ensure_ascii=False,
+        )
+    return re.sub(r"\s+", " ", prompt).strip()
+
+
+# =========================================================
+# SQLite store (TTL + size-bounded LRU)
+# =========================================================
+class LLMCache:
+    """On-disk prompt → response cache shared by every LLM call site."""
+
+    def __init__(self, path: str = LLM_CACHE_PATH, ttl: float = LLM_CACHE_TTL,
+                 max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = self.misses = self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                " key TEXT PRIMARY KEY, response TEXT NOT NULL,"
+                " created_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_lru ON llm_cache(last_access)")
+
+    @staticmethod
+    def make_key(model: str, params: dict, prompt) -> str:
+        payload = json.dumps(
+            {"model": model, "params": params, "prompt": normalize_prompt(prompt)},
+            sort_keys=True, ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row and now - row[1] <= self.ttl:
+                self._conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+                self.hits += 1
+                return row[0]
+            if row:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            self.misses += 1
+            return None
+
+    def set(self, key: str, response: str):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, response, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, response, now, now),
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+            excess = count - self.max_entries
+            if excess > 0:
+                self._conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN "
+                    "(SELECT key FROM llm_cache ORDER BY last_access ASC LIMIT ?)",
+                    (excess,),
+                )
+                self.evictions += excess
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+_cache: Optional[LLMCache] = None
+
+
+def get_llm_cache() -> LLMCache:
+    """Return the process-wide cache so every client shares one connection."""
+    global _cache
+    if _cache is None:
+        _cache = LLMCache()
+    return _cache
+
+
+# =========================================================
+# Client wrapper
+# =========================================================
+class CachedLLM:
+    """Wraps a LangChain chat model; repeated prompts are answered from LLMCache.
+
+    Anything other than invoke/ainvoke/abatch is forwarded to the wrapped client.
+    """
+
+    def __init__(self, llm, cache: LLMCache):
+        self.llm = llm
+        self.cache = cache
+        self.model = getattr(llm, "model_name", None) or getattr(llm, "model", "unknown")
+        self.params = {
+            "temperature": getattr(llm, "temperature", None),
+            "max_tokens": getattr(llm, "max_tokens", None),
+        }
+
+    def _key(self, prompt) -> str:
+        return self.cache.make_key(self.model, self.params, prompt)
+
+    def invoke(self, prompt, *args, **kwargs):
+        key = self._key(prompt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return AIMessage(content=cached)
+        resp = self.llm.invoke(prompt, *args, **kwargs)
+        if getattr(resp, "content", None):
+            self.cache.set(key, resp.content)
+        return resp
+
+    # The async methods run SQLite in a worker thread so a busy cache never blocks the event loop
+    async def ainvoke(self, prompt, *args, **kwargs):
+        key = self._key(prompt)
+        cached = await asyncio.to_thread(self.cache.get, key)
+        if cached is not None:
+            return AIMessage(content=cached)
+        resp = await self.llm.ainvoke(prompt, *args, **kwargs)
+        if getattr(resp, "content", None):
+            await asyncio.to_thread(self.cache.set, key, resp.content)
+        return resp
+
+    async def abatch(self, prompts, config=None, return_exceptions: bool = False, **kwargs):
+        """Batch call; only cache misses are sent to the wrapped client's abatch."""
+        keys = [self._key(p) for p in prompts]
+        results = await asyncio.to_thread(lambda: [self.cache.get(k) for k in keys])
+        misses = [i for i, r in enumerate(results) if r is None]
+        results = [AIMessage(content=r) if r is not None else None for r in results]
+        if misses:
+            responses = await self.llm.abatch(
+                [prompts[i] for i in misses], config=config, return_exceptions=return_exceptions, **kwargs
+            )
+            fresh = [(keys[i], resp.content) for i, resp in zip(misses, responses) if getattr(resp, "content", None)]
+            if fresh:
+                await asyncio.to_thread(lambda: [self.cache.set(k, v) for k, v in fresh])
+            for i, resp in zip(misses, responses):
+                results[i] = resp
+        return results
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
@@ -0,0 +1,166 @@
+import asyncio, os
+from typing import Optional
+import hedging
+from models import get_nemotron
+
+# =========================================================
+# Setup
+# =========================================================
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "8"))  # prompts in flight, process-wide
+LLM_BATCH_SIZE = int(os.getenv("LLM_BATCH_SIZE", "8"))     # prompts per abatch call
+
+_llm = None
+
+
+def get_llm():
+    """The one LLM client for this process (cached unless LLM_CACHE=0)."""
+    global _llm
+    if _llm is None:
+        _llm = get_nemotron()
+    return _llm
+
+
+def _content(resp) -> str:
+    return resp.content if hasattr(resp, "content") else str(resp)
+
+
+class _InFlightLimit:
+    """Counting limit on prompts in flight; a batch of n takes n slots at once."""
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self.in_flight = 0
+        self._cond = asyncio.Condition()
+
+    async def acquire(self, n: int = 1):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight + n <= self.limit)
+            self.in_flight += n
+
+    def try_acquire(self, n: int = 1) -> bool:
+        """Take n slots only if they are free right now (no waiting)."""
+        if self.in_flight + n > self.limit:
+            return False
+        self.in_flight += n
+        return True
+
+    async def release(self, n: int = 1):
+        async with self._cond:
+            self.in_flight -= n
+            self._cond.notify_all()
+
+
+# Event-loop bound state (asyncio primitives can't cross loops)
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_limit: Optional[_InFlightLimit] = None
+_pending: dict = {}  # prompt → Future shared by identical in-flight prompts
+_sending: set = set()  # running send tasks (kept referenced until done)
+_stats = {"calls": 0, "prompts": 0, "deduped": 0}
+
+
+def _bind_loop():
+    global _loop, _limit, _pending
+    loop = asyncio.get_running_loop()
+    if loop is not _loop:
+        _loop, _limit, _pending = loop, _InFlightLimit(LLM_CONCURRENCY), {}
+
+
+# Hedged duplicates count against the same limit (and are skipped when it's full)
+hedging.share_llm_slots(lambda: _limit if _loop is asyncio.get_running_loop() else None)
+
+
+# =========================================================
+# Public API
+# =========================================================
+async def complete(prompt: str) -> str:
+    """Await one completion. Identical prompts already in flight share a single call."""
+    return (await complete_many([prompt]))[0]
+
+
+async def complete_many(prompts: list, return_exceptions: bool = False) -> list:
+    """Await completions for `prompts` (same order), sent through the client's batch API.
+
+    Duplicates — within the list or already in flight elsewhere — are sent once.
+    With return_exceptions=True a failed prompt yields its exception instead of raising.
+    """
+    _bind_loop()
+    loop = asyncio.get_running_loop()
+    futures, owned = {}, []
+    for prompt in prompts:
+        if prompt in futures:
+            _stats["deduped"] += 1
+        elif prompt in _pending:
+            futures[prompt] = _pending[prompt]
+            _stats["deduped"] += 1
+        else:
+            fut = loop.create_future()
+            futures[prompt] = _pending[prompt] = fut
+            owned.append(prompt)
+
+    if owned:
+        # Sent in a task of its own: cancelling this caller must not fail the
+        # prompts other callers joined; they still get their answers
+        send = asyncio.ensure_future(_send_owned(owned, futures))
+        _sending.add(send)
+        send.add_done_callback(_sending.discard)
+
+    results = await asyncio.gather(*(asyncio.shield(futures[p]) for p in prompts), return_exceptions=True)
+    if not return_exceptions:
+        for r in results:
+            if isinstance(r, BaseException):
+                raise r
+    return results
+
+
+async def _send_owned(owned: list, futures: dict):
+    """Send one call's own prompts; if sending fails, fail whatever is still unanswered."""
+    try:
+        # A batch never exceeds the in-flight limit, so it can always take its slots at once
+        size = max(1, min(LLM_BATCH_SIZE, _limit.limit))
+        for start in range(0, len(owned), size):
+            await _send(owned[start:start + size])
+    except BaseException as e:
+        # Don't leave callers waiting on prompts that will never be sent
+        error = e if isinstance(e, Exception) else RuntimeError("LLM call cancelled")
+        for prompt in owned:
+            fut = futures[prompt]
+            if _pending.get(prompt) is fut:
+                del _pending[prompt]
+            if not fut.done():
+                fut.set_exception(error)
+        if not isinstance(e, Exception):
+            raise
+
+
+async def _send(batch: list):
+    llm = get_llm()
+    await _limit.acquire(len(batch))
+    try:
+        _stats["calls"] += 1
+        _stats["prompts"] += len(batch)
+        if len(batch) == 1:
+            responses = [await _safe_ainvoke(llm, batch[0])]
+        else:
+            responses = await llm.abatch(batch, config={"max_concurrency": len(batch)}, return_exceptions=True)
+    finally:
+        await _limit.release(len(batch))
+    for prompt, resp in zip(batch, responses):
+        fut = _pending.pop(prompt, None)
+        if fut is None or fut.done():
+            continue
+        if isinstance(resp, BaseException):
+            fut.set_exception(resp)
+        else:
+            fut.set_result(_content(resp))
+
+
+async def _safe_ainvoke(llm, prompt):
+    try:
+        return await llm.ainvoke(prompt)
+    except Exception as e:
+        return e
+
+
+def stats() -> dict:
+    in_flight = _limit.in_flight if _limit else 0
+    return {**_stats, "in_flight": in_flight, "limit": LLM_CONCURRENCY}
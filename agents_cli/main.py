@@ -1,12 +1,23 @@
-import asyncio, os, csv, re, glob, hashlib, json, requests
-from typing import TypedDict, Optional
-from bs4 import BeautifulSoup
+import asyncio, os, csv, re, glob, json, operator, time, uuid
+from typing import Annotated, TypedDict, Optional
 from langgraph.graph import StateGraph, START, END
+from langgraph.config import get_stream_writer
+from langgraph.types import Send
 from dotenv import load_dotenv
-from tavily import TavilyClient
 from utils.bcbs_scraper import get_bcbs_providers_live
-from models import get_nemotron
-from scoring import compute_final_scores
+from llm_cache import CachedLLM
+import llm_gateway
+import outbound
+import hedging
+from llm_gateway import complete
+from lexicon import build_lexicon
+from semantic_cache import SemanticCache
+from review_fetcher import SITE_TIMEOUT, fetch_review_pages, save_review_page
+from parse_pool import parse_page, shutdown_parse_pool
+from scoring import prescore, print_ranking, rank_partial, rank_providers, resolve_alignments, top_k_indices
+from review_cache import get_review_cache, provider_key
+from directory_cache import cached_providers, directory_key, get_directory_cache
+from deadline import RANK_RESERVE, expired, iterate_until, new_deadline, remaining, run_until, sub_deadline
 from utils.utils import city_state_from_zip
 from utils.utils import cleanup_temp_data
 
@@ -16,13 +27,21 @@ import json, re
 # Setup
 # =========================================================
 load_dotenv()
-tavily = TavilyClient(api_key=os.getenv("TAVILY_API_KEY"))
-llm = get_nemotron()
-
-MAX_PROVIDERS = 7
-MAX_CHARS = 15000
+lexicon = build_lexicon()
+symptom_cache = SemanticCache()
+review_cache = get_review_cache()
+
+MAX_PROVIDERS = 7  # review analyses per search (cached providers don't count)
+PRESCORE_TOP_K = int(os.getenv("PRESCORE_TOP_K", "3"))  # drop candidates that can't reach this rank
+MAX_CONCURRENCY = int(os.getenv("ANALYSIS_CONCURRENCY", "4"))  # 1 = sequential
+PROVIDER_TIMEOUT = float(os.getenv("PROVIDER_TIMEOUT", "120"))  # seconds per provider
+MAX_CHARS = 200000  # prompt size is bounded by chunking.REVIEW_TOKEN_BUDGET, not the page size
 SITE_WEIGHT = 0.4
 MODEL_WEIGHT = 0.6
+# Shares of the remaining search budget (deadline.SEARCH_BUDGET)
+SPECIALTY_SHARE = 0.1  # LLM specialty inference
+FIND_SHARE = 0.4       # provider directory lookup
+FETCH_SHARE = 0.6      # review-page fetching, within one provider's slice
 
 
 # =========================================================
@@ -39,46 +58,59 @@ class GraphState(TypedDict):
     gender: Optional[str]
     is_pediatric: Optional[bool]
     providers: Optional[list]
+    ranked: Optional[list]
+    deadline: Optional[float]  # wall-clock timestamp; see deadline.py
+    partial: Optional[bool]    # some work was cut off by the deadline
+    search_id: Optional[str]   # key of the per-search objects shared by the parallel branches
+    selected: Optional[list]   # provider indices that get ranked (cached + analyzed)
+    candidates: Optional[list] # [{"index", "upper"}] sent to AnalyzeProvider, best prescore first
+    alignments: Optional[dict] # {specialty: multiplier} from the Align branch
+    results: Annotated[list, operator.add]  # one entry per provider branch, merged by the reducer
 
 
 # =========================================================
 # Helper: LLM reasoning
 # =========================================================
-def get_specialty_from_symptom(symptom_description: str, age: int, gender: str) -> str:
+async def classify_or_infer_specialty(user_input: str, age: int, gender: str) -> Optional[str]:
+    """Single LLM call for lexicon misses: keep a specialty name, or infer one from a symptom."""
     pediatric_note = "The patient is a child (under 16)." if age < 16 else "The patient is an adult."
     prompt = f"""
     You are a medical triage assistant.
-    Given this patient profile:
-
-    Symptom: "{symptom_description}"
+    The patient typed: "{user_input}"
     Age: {age}
     Sex: {gender}
     Note: {pediatric_note}
 
-    Suggest the most appropriate specialty that should evaluate this case.
+    If the text is already a medical specialty, return that specialty.
+    Otherwise treat it as a symptom and suggest the most appropriate specialty to evaluate it.
     Return in strict JSON only:
     {{"recommended": "specialty"}}
     """
     try:
-        resp = llm.invoke(prompt)
-        text = resp.content.strip() if hasattr(resp, "content") else str(resp)
+        text = (await complete(prompt)).strip()
         match = re.search(r'"recommended"\s*:\s*"([^"]+)"', text)
         if match:
             return match.group(1).strip()
     except Exception as e:
         print(f"⚠️ Error inferring specialty: {e}")
-    return "Internal Medicine"
-
-
-def is_specialty_term(user_input: str) -> bool:
-    prompt = f'Is "{user_input}" a valid medical specialty? Answer only YES or NO.'
-    try:
-        resp = llm.invoke(prompt)
-        text = resp.content.strip().upper() if hasattr(resp, "content") else str(resp).upper()
-        return text.startswith("YES")
-    except Exception as e:
-        print(f"⚠️ Error checking specialty: {e}")
-        return False
+    return None
+
+
+async def resolve_specialty(user_input: str, age: int, gender: str) -> str:
+    """Resolve from the local lexicon, then the symptom cache; only call the LLM on a miss."""
+    specialty = lexicon.resolve(user_input, is_pediatric=age < 16)
+    if specialty:
+        print(f"📚 Lexicon match: {specialty}")
+        return specialty
+    specialty = symptom_cache.lookup(user_input, age, gender)
+    if specialty:
+        print(f"🧭 Similar symptom seen before: {specialty}")
+        return specialty
+    specialty = await classify_or_infer_specialty(user_input, age, gender)
+    if not specialty:
+        return "Internal Medicine"
+    symptom_cache.add(user_input, age, gender, specialty)
+    return specialty
 
 
 # =========================================================
@@ -97,26 +129,58 @@ async def get_user_info(state: GraphState):
     gender = input("⚧️ Enter patient sex (Male/Female/Other): ").strip().capitalize() or "Unknown"
     state["age"] = age
     state["gender"] = gender
-    state["is_pediatric"] = age < 16
-
-    if is_specialty_term(user_input):
-        state["specialty"] = user_input
-    else:
-        state["specialty"] = get_specialty_from_symptom(user_input, age, gender)
 
     insurance = input("🏥 Enter your insurance provider (currently only BCBS supported): ").strip()
     state["insurance"] = insurance
 
     if "bcbs" in insurance.lower() or "blue" in insurance.lower():
-        member_id = input("💳 Enter your BCBS Member ID or prefix (e.g., ZGP1234567): ").strip()
-        prefix = member_id[:3].upper() if len(member_id) >= 3 else "UNK"
-        state["member_id"] = prefix
+        state["member_id"] = input("💳 Enter your BCBS Member ID or prefix (e.g., ZGP1234567): ").strip()
     else:
         state["member_id"] = None
 
     location = input("📍 Enter your location (City, State ZIP): ").strip()
     postal_match = re.search(r"\b\d{5}\b", location)
-    postal_code = postal_match.group(0) if postal_match else input("📬 Enter your ZIP code: ").strip()
+    state["postal_code"] = postal_match.group(0) if postal_match else input("📬 Enter your ZIP code: ").strip()
+    state["location"] = location
+
+    return await prepare_request(state)
+
+
+async def prepare_request(state: GraphState):
+    """Derive specialty, member prefix and location from raw request fields (no prompts)."""
+    # The search budget starts once the request is known (after any interactive prompts)
+    state["deadline"] = state.get("deadline") or new_deadline()
+    state["partial"] = False
+    age = state.get("age")
+    age = 30 if age is None else int(age)
+    gender = (state.get("gender") or "Unknown").capitalize()
+    state["age"] = age
+    state["gender"] = gender
+    state["is_pediatric"] = age < 16
+
+    if not state.get("specialty"):
+        try:
+            state["specialty"] = await run_until(
+                resolve_specialty(state["symptom"], age, gender),
+                sub_deadline(state["deadline"], SPECIALTY_SHARE),
+            )
+        except asyncio.TimeoutError:
+            print("⏱️ Specialty inference ran out of time; using Internal Medicine")
+            state["specialty"] = "Internal Medicine"
+
+    insurance = state.get("insurance") or ""
+    state["insurance"] = insurance
+    if "bcbs" in insurance.lower() or "blue" in insurance.lower():
+        member_id = (state.get("member_id") or "").strip()
+        state["member_id"] = member_id[:3].upper() if len(member_id) >= 3 else "UNK"
+    else:
+        state["member_id"] = None
+
+    location = (state.get("location") or "").strip()
+    postal_code = state.get("postal_code")
+    if not postal_code:
+        postal_match = re.search(r"\b\d{5}\b", location)
+        postal_code = postal_match.group(0) if postal_match else ""
     state["postal_code"] = postal_code
 
     # ✅ Auto-fill city/state if missing
@@ -154,25 +218,36 @@ async def find_providers(state: GraphState):
     print(f"\n🔍 Finding providers for {specialty} ({insurance})...")
 
     if "bcbs" in insurance or "blue" in insurance:
-        providers = await get_bcbs_providers_live(
-            postal_code=postal,
-            prefix=prefix,
-            specialty=specialty,
-            location=location,
-            max_pages=1,
-            headless=True,
+        # A list, or an async iterator yielding each card as soon as it is parsed;
+        # repeated searches are served from the directory cache instead of a new scrape
+        source = cached_providers(
+            directory_key(prefix, postal, specialty),
+            lambda: get_bcbs_providers_live(
+                postal_code=postal,
+                prefix=prefix,
+                specialty=specialty,
+                location=location,
+                max_pages=1,
+                headless=True,
+            ),
         )
     else:
         if os.path.exists("providers.csv"):
             with open("providers.csv", newline="", encoding="utf-8") as f:
-                providers = list(csv.DictReader(f))
+                source = list(csv.DictReader(f))
         else:
             print("❌ No providers found.")
             return state
 
+    try:
+        async for p in iterate_until(source, sub_deadline(state.get("deadline"), FIND_SHARE)):
+            p["alignment_multiplier"] = 1.2 if state["is_pediatric"] and "pediatric" in p.get("specialty", "").lower() else 1.0
+            providers.append(p)
+    except asyncio.TimeoutError:
+        print("⏱️ Provider lookup ran out of time.")
+        state["partial"] = True
+
     print(f"✅ Found {len(providers)} providers.")
-    for p in providers:
-        p["alignment_multiplier"] = 1.2 if state["is_pediatric"] and "pediatric" in p.get("specialty", "").lower() else 1.0
     state["providers"] = providers
     return state
 
@@ -180,77 +255,16 @@ async def find_providers(state: GraphState):
 # =========================================================
 # Step 3: Fetch & Save HTML
 # =========================================================
-def fetch_reviews(name, city, specialty):
+async def fetch_reviews(name, city, specialty, site_timeout: float = SITE_TIMEOUT):
     print(f"\n🌐 Fetching review pages for {name} — {specialty}, {city}")
-    os.makedirs("doctor_pages", exist_ok=True)
     pages = {}
 
-    site_domains = [
-        "healthgrades.com/physician",
-        "vitals.com/doctors",
-        "ratemds.com/doctor-ratings",
-    ]
-
-    for site in site_domains:
-        try:
-            query = f"{name}, {city}, {specialty} site:{site}"
-            print(f"🔍 Searching {site}...")
-            resp = tavily.search(query=query, include_raw_content=True, max_results=10)
-
-            if not resp.get("results"):
-                print(f"  ⚠️ No results for {site}")
-                continue
-
-            result = next(
-                (r for r in resp["results"]
-                 if r.get("url", "").startswith(f"https://www.{site}") or
-                    r.get("url", "").startswith(f"http://www.{site}") or
-                    r.get("url", "").startswith(f"https://{site}")),
-                resp["results"][0]
-            )
-
-            url = result.get("url", "")
-            raw = result.get("raw_content") or result.get("content", "")
-
-            if not raw and url:
-                print(f"  ⚠️ Tavily missing content, fetching directly from {url}")
-                try:
-                    r = requests.get(
-                        url,
-                        headers={
-                            "User-Agent": (
-                                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                                "Chrome/122.0.0.0 Safari/537.36"
-                            )
-                        },
-                        timeout=15,
-                    )
-                    if r.status_code == 200 and len(r.text) > 1000:
-                        raw = r.text
-                    else:
-                        print(f"  ❌ Fallback fetch failed ({r.status_code})")
-                        continue
-                except Exception as e:
-                    print(f"  ❌ Error fetching {url}: {e}")
-                    continue
-
-            if raw:
-                hash_id = hashlib.sha256(url.encode()).hexdigest()[:8]
-                safe_site = site.replace("/", "_").replace(":", "_")
-                safe_name = re.sub(r"[^A-Za-z0-9 _.-]", "", name)
-                filename = f"doctor_pages/{safe_name}_{safe_site}_{hash_id}.html"
-
-                with open(filename, "w", encoding="utf-8") as f:
-                    f.write(raw)
-                print(f"  💾 Saved HTML. ")
-                pages[site] = raw[:MAX_CHARS]
-            else:
-                print(f"  ⚠️ No usable HTML from {site}")
-
-        except Exception as e:
-            print(f"  ❌ Error while fetching {site}: {e}")
-            continue
+    # All sites (and any fallback downloads) are fetched concurrently
+    fetched = await fetch_review_pages(name, city, specialty, site_timeout=site_timeout)
+    for site, (url, raw) in fetched.items():
+        save_review_page(name, site, url, raw)
+        print(f"  💾 Saved HTML. ")
+        pages[site] = raw[:MAX_CHARS]
 
     if not pages:
         print("  ❌ No usable pages found across all sites.")
@@ -260,28 +274,8 @@ def fetch_reviews(name, city, specialty):
 # =========================================================
 # Step 4: LLM-based review extraction
 # =========================================================
-def extract_relevant_chunks(html: str) -> str:
-    soup = BeautifulSoup(html, "html.parser")
-    text = soup.get_text(" ", strip=True)
-    matches = re.findall(
-        r"((?:\d(?:\.\d)?)\s*(?:Star|Rating|ratings?)|based on\s*\d+\s*(?:reviews|ratings)|\d+\s*(?:patient\s+)?reviews?)",
-        text,
-        re.I,
-    )
-    if matches:
-        chunks = []
-        for m in matches:
-            idx = text.lower().find(m.lower())
-            if idx != -1:
-                start = max(0, idx - 40)
-                end = min(len(text), idx + 80)
-                chunks.append(text[start:end])
-        return " ... ".join(chunks)
-    return text[:8000]
-
-
-def llm_extract_review_data(html_content: str, site: str, name: str) -> dict:
-    text = extract_relevant_chunks(html_content)
+async def llm_extract_review_data(text: str, site: str, name: str) -> dict:
+    """`text` is the page's selected review chunks (see parse_pool.parse_review_page)."""
     prompt = f"""
 You are reading reviews for {name} from {site}.
 Extract three numbers:
@@ -296,8 +290,7 @@ Text:
 {text}
 """
     try:
-        resp = llm.invoke(prompt)
-        text_out = resp.content if hasattr(resp, "content") else str(resp)
+        text_out = await complete(prompt)
         # Extract *only* the first valid JSON-like object
         match = re.search(r"\{[^{}]+\}", text_out, re.S)
         if match:
@@ -326,8 +319,16 @@ Text:
 # =========================================================
 # Step 5: Doctor-level reasoning
 # =========================================================
-async def rag_analyze_doctor(name, specialty, city, symptom):
-    pages = fetch_reviews(name, city, specialty)
+async def gather_review_pages(name, specialty, city, deadline: Optional[float] = None) -> dict:
+    """Review pages for one doctor, fetched within the fetch share of `deadline`."""
+    fetch_deadline = sub_deadline(deadline, FETCH_SHARE)
+    return await fetch_reviews(name, city, specialty, site_timeout=min(SITE_TIMEOUT, remaining(fetch_deadline)))
+
+
+async def summarize_reviews(name, specialty, city, pages: dict, deadline: Optional[float] = None) -> str:
+    """Score fetched pages into a summary; raises asyncio.TimeoutError if nothing finishes by `deadline`."""
+    if expired(deadline):
+        raise asyncio.TimeoutError
     if not pages:
         return f"❌ No review pages found for {name}."
 
@@ -336,9 +337,34 @@ async def rag_analyze_doctor(name, specialty, city, symptom):
     rating_count, sentiment_count = 0, 0
     site_lines = []
 
-    for site, text in pages.items():
-        print(f"\n   🌍 Processing {site} ({len(text)} chars)")
-        data = llm_extract_review_data(text, site, name)
+    async def extract(site, html):
+        print(f"\n   🌍 Processing {site} ({len(html)} chars)")
+        # Parsing is CPU-bound: it runs in the process pool, off the event loop
+        parsed = await parse_page(site, html)
+        data = parsed["extracted"]
+        if data:
+            # Deterministic hit: no LLM call; the star rating stands in for sentiment
+            print(f"   ⚡ {data['source']} ({data['confidence']:.2f}): "
+                  f"{data['rating']}/5 from {data['reviews']} reviews")
+            return {"reviews": data["reviews"], "rating": data["rating"], "sentiment": data["rating"] * 2}
+        return await llm_extract_review_data(parsed["chunks"], site, name)
+
+    # Sites still extracting at the deadline are dropped; the rest still count
+    tasks = {site: asyncio.ensure_future(extract(site, html)) for site, html in pages.items()}
+    await asyncio.wait(tasks.values(), timeout=remaining(deadline) if deadline else None)
+    extracted = {}
+    for site, task in tasks.items():
+        if not task.done():
+            task.cancel()
+            print(f"   ⏱️ {site} extraction cut off by the deadline")
+        elif task.exception() is None:
+            extracted[site] = task.result()
+        else:
+            print(f"   ⚠️ {site} extraction failed: {task.exception()}")
+    if not extracted:
+        raise asyncio.TimeoutError
+
+    for site, data in extracted.items():
         num, site_rating, sentiment_score = data["reviews"], data["rating"], data["sentiment"]
         combined = round((site_rating * 2 * SITE_WEIGHT) + (sentiment_score * MODEL_WEIGHT), 2)
         total_reviews += num
@@ -365,60 +391,373 @@ async def rag_analyze_doctor(name, specialty, city, symptom):
     )
 
 
+async def rag_analyze_doctor(name, specialty, city, symptom, deadline: Optional[float] = None):
+    """Fetch and score one doctor's reviews outside the graph (the provider subgraph runs the same two steps)."""
+    pages = await gather_review_pages(name, specialty, city, deadline)
+    return await summarize_reviews(name, specialty, city, pages, deadline)
+
+
+def parse_summary(summary: str) -> dict:
+    """The numbers from a summarize_reviews summary."""
+    m_reviews = re.search(r"Total reviews.*?:\s*~(\d+)", summary)
+    m_sent = re.search(r"Average 🧠 sentiment:\s*(\d+(?:\.\d+)?)", summary)
+    m_rating = re.search(r"Average ⭐ site rating:\s*(\d+(?:\.\d+)?)", summary)
+    m_score = re.search(r"Overall blended score:\s*~(\d+(?:\.\d+)?)", summary)
+    return {
+        "review_count": int(m_reviews.group(1)) if m_reviews else 0,
+        "sentiment": float(m_sent.group(1)) if m_sent else 0.0,
+        "avg_rating": float(m_rating.group(1)) if m_rating else 0.0,
+        "score": float(m_score.group(1)) if m_score else 0.0,
+    }
+
+
+def apply_summary(p: dict, summary: str) -> dict:
+    """Copy the numbers from a summary onto the provider."""
+    p.update(parse_summary(summary))
+    return p
+
+
 # =========================================================
-# Step 6: Aggregate & Rank
+# Step 6: Per-provider subgraph (map step, fanned out with Send)
 # =========================================================
-async def analyze_and_score(state: GraphState):
-    providers = state.get("providers", [])
-    if not providers:
-        print("❌ No providers to analyze.")
-        return state
+class ProviderState(TypedDict):
+    search_id: str
+    index: int                 # position in GraphState["providers"]
+    rank: int                  # prescore order, 1 = most promising
+    provider: dict
+    city: Optional[str]
+    upper: float               # best final score a full analysis could reach
+    deadline: Optional[float]
+    pages: Optional[dict]
+    summary: Optional[str]
+    timings: Optional[dict]    # subgraph node → seconds
+
+
+class AlignState(TypedDict):
+    search_id: str
+    specialties: list
+    symptom: Optional[str]
+    deadline: Optional[float]
+
+
+# Per-search objects shared by the parallel branches (the graph state only carries search_id)
+_runs = {}
+
+
+def timed(node_name: str, fn):
+    """Wrap a subgraph node so its wall time lands in state["timings"]."""
+    async def node(pstate: ProviderState):
+        started = time.perf_counter()
+        update = await fn(pstate)
+        timings = {**(pstate.get("timings") or {}), node_name: round(time.perf_counter() - started, 3)}
+        return {**update, "timings": timings}
+    return node
+
+
+async def fetch_provider_reviews(pstate: ProviderState):
+    p = pstate["provider"]
+    pages = await gather_review_pages(p["name"], p.get("Specialty"), pstate["city"], pstate["deadline"])
+    return {"pages": pages}
+
+
+async def score_provider_reviews(pstate: ProviderState):
+    p = pstate["provider"]
+    summary = await summarize_reviews(p["name"], p.get("Specialty"), pstate["city"], pstate["pages"], pstate["deadline"])
+    return {"summary": summary, "pages": None}  # raw HTML isn't needed past this point
+
 
-    summaries = []
-    for idx, p in enumerate(providers[:MAX_PROVIDERS], start=1):
-        name = p.get("name") or p.get("Name")
-        print(f"\n➡️ Doctor {idx}: {name}")
-        summary = await rag_analyze_doctor(name, p.get("Specialty"), state["location"], state["symptom"])
+def build_provider_graph():
+    graph = StateGraph(ProviderState)
+    graph.add_node("FetchReviews", timed("FetchReviews", fetch_provider_reviews))
+    graph.add_node("ScoreReviews", timed("ScoreReviews", score_provider_reviews))
+    graph.add_edge(START, "FetchReviews")
+    graph.add_edge("FetchReviews", "ScoreReviews")
+    graph.add_edge("ScoreReviews", END)
+    return graph.compile()
 
-        m_reviews = re.search(r"Total reviews.*?:\s*~(\d+)", summary)
-        m_sent = re.search(r"Average 🧠 sentiment:\s*(\d+(?:\.\d+)?)", summary)
-        m_rating = re.search(r"Average ⭐ site rating:\s*(\d+(?:\.\d+)?)", summary)
-        m_score = re.search(r"Overall blended score:\s*~(\d+(?:\.\d+)?)", summary)
 
-        p["review_count"] = int(m_reviews.group(1)) if m_reviews else 0
-        p["sentiment"] = float(m_sent.group(1)) if m_sent else 0.0
-        p["avg_rating"] = float(m_rating.group(1)) if m_rating else 0.0
-        p["score"] = float(m_score.group(1)) if m_score else 0.0
-        summaries.append(p)
+provider_graph = build_provider_graph()
+
+
+def emit_provisional(run: dict, writer):
+    """Provisional ranking of everything finished so far; also raises the early-drop bar."""
+    ranking = rank_providers(run["providers"], run["finished"], symptom=run["symptom"], alignments=run["alignments"])
+    writer({"type": "provisional", "done": len(run["finished"]), "total": run["total"], "ranking": ranking})
+    if len(ranking) >= PRESCORE_TOP_K:
+        run["bar"] = ranking[PRESCORE_TOP_K - 1]["FinalScore"]
+
+
+async def analyze_provider(pstate: ProviderState):
+    """Run one provider through the subgraph; timeouts and errors stay inside this branch."""
+    run = _runs[pstate["search_id"]]
+    p = pstate["provider"]
+    name = p["name"]
+    writer = get_stream_writer()
+    result = {"index": pstate["index"], "name": name, "status": "partial", "summary": None, "fields": {}, "timings": {}}
+
+    async with run["semaphore"]:  # FIFO, and branches are sent best prescore first
+        bar = run["bar"]
+        if expired(pstate["deadline"]):
+            print(f"⏱️ Skipping {name}: search deadline reached")
+        elif bar is not None and pstate["upper"] < bar:
+            # Early drop: even a perfect analysis can't reach the current top-k
+            result["status"] = "dropped"
+            print(f"✂️ Dropping {name}: at most {pstate['upper']:.2f} < top-{PRESCORE_TOP_K} {bar:.2f}")
+        else:
+            print(f"\n➡️ Doctor {pstate['rank']}: {name}")
+            provider_deadline = sub_deadline(pstate["deadline"], cap=PROVIDER_TIMEOUT)
+            try:
+                out = await run_until(
+                    provider_graph.ainvoke({**pstate, "deadline": provider_deadline, "timings": {}}),
+                    provider_deadline,
+                )
+                result.update(status="done", summary=out["summary"], fields=parse_summary(out["summary"]),
+                              timings=out["timings"])
+            except asyncio.TimeoutError:
+                print(f"⏱️ Timed out analyzing {name}; it will be ranked by distance only")
+            except Exception as e:
+                print(f"❌ Analysis failed for {name}: {e}")
+                result.update(status="error", error=str(e))
+
+    if result["status"] == "done":
+        run["finished"].append({**p, **result["fields"]})
+        if result["fields"]["review_count"] > 0:
+            await asyncio.to_thread(review_cache.put, provider_key(name, pstate["city"]), result["fields"])
+        writer({"type": "provider", "name": name, "summary": result["summary"], "partial": False,
+                "timings": result["timings"]})
+        emit_provisional(run, writer)
+    else:
+        writer({"type": "provider", "name": name, "summary": None, "partial": True, "status": result["status"]})
+    return {"results": [result]}
+
+
+async def align_specialties(astate: AlignState):
+    """Alignment multipliers, resolved in their own branch next to the provider analyses."""
+    try:
+        alignments = await run_until(resolve_alignments(astate["specialties"], astate["symptom"]), astate["deadline"])
+    except asyncio.TimeoutError:
+        alignments = {}
+    run = _runs.get(astate["search_id"])
+    if run is not None:
+        run["alignments"] = alignments
+    return {"alignments": alignments}
 
+
+# =========================================================
+# Step 7: Prescore (fan-out) & Rank (reduce)
+# =========================================================
+async def prescore_providers(state: GraphState):
+    """Zero-cost prescore of every provider; cached aggregates skip review analysis entirely."""
+    providers = state.get("providers") or []
     for p in providers:
         if "Name" in p and "name" not in p:
             p["name"] = p["Name"]
 
-    ranked = compute_final_scores(providers, summaries, symptom=state["symptom"])
-    cleanup_temp_data()
-    return state
+    writer = get_stream_writer()
+    keys = [provider_key(p["name"], state["location"]) for p in providers]
+    cached = await asyncio.to_thread(review_cache.get_many, keys)  # SQLite off the event loop
+    estimate, upper = prescore(providers, state.get("specialty"), [cached.get(k) for k in keys])
+    order = top_k_indices(estimate) if providers else []
+    for i in order:
+        providers[i]["prescore"] = float(estimate[i])
+    from_cache = [i for i in order if keys[i] in cached]
+    to_analyze = [i for i in order if keys[i] not in cached][:MAX_PROVIDERS]
+    selected = sorted(from_cache + to_analyze)  # directory order, for ranking ties
+    if providers:
+        print(f"🧮 Prescored {len(providers)} providers: {len(from_cache)} cached, "
+              f"{len(to_analyze)} sent to review analysis")
+
+    search_id = state.get("search_id") or uuid.uuid4().hex
+    run = _runs[search_id] = {
+        "semaphore": asyncio.Semaphore(max(1, MAX_CONCURRENCY)),
+        "providers": providers,
+        "symptom": state.get("symptom"),
+        "finished": [],
+        "alignments": {},
+        "bar": None,
+        "total": len(selected),
+    }
+
+    results = []
+    for i in from_cache:
+        p = providers[i]
+        fields = cached[keys[i]]
+        run["finished"].append({**p, **fields})
+        summary = f"{p['name']}: ~{fields['review_count']} reviews, 🧠 {fields['sentiment']:.2f}/10 (cached)"
+        results.append({"index": i, "name": p["name"], "status": "cached", "summary": summary,
+                        "fields": fields, "timings": {}})
+        writer({"type": "provider", "name": p["name"], "summary": summary, "partial": False, "cached": True})
+    if from_cache:
+        emit_provisional(run, writer)
+
+    return {
+        "providers": providers,
+        "search_id": search_id,
+        "selected": selected,
+        "candidates": [{"index": i, "upper": float(upper[i])} for i in to_analyze],
+        "results": results,
+    }
+
+
+def fan_out(state: GraphState):
+    """Map: one AnalyzeProvider branch per candidate, plus the Align branch."""
+    deadline = sub_deadline(state.get("deadline"), reserve=RANK_RESERVE)
+    providers = state.get("providers") or []
+    sends = [Send("Align", {
+        "search_id": state["search_id"],
+        "specialties": [providers[i].get("Specialty") for i in state.get("selected") or []],
+        "symptom": state.get("symptom"),
+        "deadline": deadline,
+    })]
+    for rank, c in enumerate(state.get("candidates") or [], start=1):
+        sends.append(Send("AnalyzeProvider", {
+            "search_id": state["search_id"],
+            "index": c["index"],
+            "rank": rank,
+            "provider": providers[c["index"]],
+            "city": state.get("location"),
+            "upper": c["upper"],
+            "deadline": deadline,
+        }))
+    return sends
+
+
+def release_search(search_id: Optional[str]):
+    """Drop a search's shared objects. Safe to call twice."""
+    _runs.pop(search_id, None)
+
+
+async def rank_results(state: GraphState):
+    """Reduce: merge the branch results onto the providers and rank them."""
+    release_search(state.get("search_id"))
+
+    providers = state.get("providers") or []
+    if not providers:
+        print("❌ No providers to analyze.")
+        return {"ranked": []}
+
+    status = {}
+    for r in state.get("results") or []:
+        p = providers[r["index"]]
+        status[r["index"]] = r["status"]
+        if r["status"] in ("done", "cached"):
+            p.update(r["fields"])
+            if r["timings"]:
+                p["timings"] = r["timings"]
+                print(f"⏱️ {r['name']}: " + ", ".join(f"{node} {s:.2f}s" for node, s in r["timings"].items()))
+        elif r["status"] == "dropped":
+            p["dropped"] = True
+        else:
+            p["partial"] = True
+
+    # Final ranking uses directory order so ties break as before; providers cut off
+    # by the deadline, failed or dropped early follow, scored by distance only
+    selected = state.get("selected") or []
+    summaries = [providers[i] for i in selected if status.get(i) in ("done", "cached")]
+    unscored = [providers[i] for i in selected if status.get(i) not in ("done", "cached")]
+    alignments = state.get("alignments") or {}
+    ranked = rank_providers(providers, summaries, symptom=state.get("symptom"), alignments=alignments)
+    ranked += rank_partial(unscored, alignments=alignments)
+    print_ranking(ranked)
+
+    partial = bool(state.get("partial")) or any(s in ("partial", "error") for s in status.values())
+    get_stream_writer()({"type": "final", "ranking": ranked, "partial": partial})
+    return {"providers": providers, "ranked": ranked, "partial": partial}
 
 
 # =========================================================
 # Graph Orchestration
 # =========================================================
-graph = StateGraph(GraphState)
-graph.add_node("GetUserInfo", get_user_info)
-graph.add_node("FindProviders", find_providers)
-graph.add_node("AnalyzeAndScore", analyze_and_score)
-graph.add_edge(START, "GetUserInfo")
-graph.add_edge("GetUserInfo", "FindProviders")
-graph.add_edge("FindProviders", "AnalyzeAndScore")
-graph.add_edge("AnalyzeAndScore", END)
-app = graph.compile()
+def build_graph(interactive: bool = True):
+    """Compile the pipeline; non-interactive graphs take request fields from the input state.
+
+    GetUserInfo → FindProviders → Prescore ─Send→ AnalyzeProvider × N ─┐
+                                           └─Send→ Align ──────────────┴→ Rank
+    """
+    graph = StateGraph(GraphState)
+    graph.add_node("GetUserInfo", get_user_info if interactive else prepare_request)
+    graph.add_node("FindProviders", find_providers)
+    graph.add_node("Prescore", prescore_providers)
+    graph.add_node("AnalyzeProvider", analyze_provider)
+    graph.add_node("Align", align_specialties)
+    graph.add_node("Rank", rank_results)
+    graph.add_edge(START, "GetUserInfo")
+    graph.add_edge("GetUserInfo", "FindProviders")
+    graph.add_edge("FindProviders", "Prescore")
+    graph.add_conditional_edges("Prescore", fan_out, ["AnalyzeProvider", "Align"])
+    graph.add_edge("AnalyzeProvider", "Rank")
+    graph.add_edge("Align", "Rank")
+    graph.add_edge("Rank", END)
+    return graph.compile()
+
+
+app = build_graph()
 
 
 # =========================================================
 # Runner
 # =========================================================
+def report_cache_stats():
+    llm = llm_gateway.get_llm()
+    if isinstance(llm, CachedLLM):
+        print(f"🗄️ LLM cache: {llm.cache.stats()}")
+    print(f"🚦 LLM gateway: {llm_gateway.stats()}")
+    for name, hedge_stats in hedging.stats().items():
+        print(f"🪁 Hedging {name}: {hedge_stats}")
+    for host, host_stats in outbound.stats().items():
+        print(f"🌐 {host}: {host_stats}")
+    print(f"📚 Specialty lexicon: {lexicon.stats()}")
+    print(f"🧭 Symptom cache: {symptom_cache.stats()}")
+    print(f"⭐ Review cache: {review_cache.stats()}")
+    if get_directory_cache() is not None:
+        print(f"📒 Directory cache: {get_directory_cache().stats()}")
+    symptom_cache.save()
+
+
+async def stream_search(init_state: Optional[dict] = None, interactive: bool = False):
+    """Async generator of pipeline events for callers that render or forward results live.
+
+    Yields {"type": "provider"} as each provider's reviews are summarized,
+    {"type": "provisional"} with the ranking so far, and one {"type": "final"}.
+    """
+    graph = app if interactive else build_graph(interactive=False)
+    init_state = {**(init_state or {}), "search_id": (init_state or {}).get("search_id") or uuid.uuid4().hex}
+    try:
+        async for event in graph.astream(init_state, stream_mode="custom"):
+            yield event
+    finally:
+        # rank_results releases them too, but a graph that fails or is abandoned never gets there
+        release_search(init_state["search_id"])
+
+
+async def run_search(graph, init_state: dict) -> dict:
+    """graph.ainvoke() for one search, releasing its shared objects however it ends."""
+    init_state = {**init_state, "search_id": init_state.get("search_id") or uuid.uuid4().hex}
+    try:
+        return await graph.ainvoke(init_state)
+    finally:
+        release_search(init_state["search_id"])
+
+
+def render_event(event: dict):
+    if event["type"] == "provider" and event.get("partial"):
+        reason = {"dropped": "dropped, can't reach the top", "error": "analysis failed"}.get(
+            event.get("status"), "not analyzed before the deadline")
+        print(f"\n⏱️ {event['name']}: {reason}")
+    elif event["type"] == "provider":
+        print(f"\n📝 {event['summary']}")
+    elif event["type"] == "provisional":
+        top = " | ".join(f"{r['Name']} {r['FinalScore']}" for r in event["ranking"][:3])
+        print(f"📈 Provisional top ({event['done']}/{event['total']}): {top}")
+
+
 async def run():
-    await app.ainvoke({})
+    async for event in stream_search(interactive=True):
+        render_event(event)
+    # Temp files are shared by every search in the process, so they go only once nothing is running
+    cleanup_temp_data()
+    report_cache_stats()
+    shutdown_parse_pool()
 
 if __name__ == "__main__":
     asyncio.run(run())
@@ -1,11 +1,17 @@
 import os
 from langchain_openai import ChatOpenAI
 from dotenv import load_dotenv
+from llm_cache import CachedLLM, get_llm_cache
+from hedging import HEDGING, HedgedLLM
 load_dotenv()
 
 
 def get_nemotron():
-    """Return a LangChain-compatible LLM client using OpenRouter + Nemotron."""
+    """Return a LangChain-compatible LLM client using OpenRouter + Nemotron.
+
+    Responses go through the on-disk LLM cache unless LLM_CACHE=0; with
+    HEDGING=1 slow cache misses are hedged.
+    """
     llm = ChatOpenAI(
         openai_api_base="https://openrouter.ai/api/v1",
         openai_api_key=os.getenv("OPEN_AI_API_KEY"),
@@ -13,4 +19,8 @@ def get_nemotron():
         temperature=0.0,
         max_tokens=800,
     )
-    return llm
+    if HEDGING:
+        llm = HedgedLLM(llm)
+    if os.getenv("LLM_CACHE", "1") == "0":
+        return llm
+    return CachedLLM(llm, get_llm_cache())
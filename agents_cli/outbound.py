@@ -0,0 +1,192 @@
+import asyncio, os, random, time
+from typing import Optional
+from urllib.parse import urlsplit
+import httpx
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_random_exponential
+
+# =========================================================
+# Setup
+# =========================================================
+OUTBOUND_RATE = float(os.getenv("OUTBOUND_RATE", "5"))                  # requests/second per host
+OUTBOUND_MAX_CONCURRENCY = int(os.getenv("OUTBOUND_MAX_CONCURRENCY", "8"))  # AIMD ceiling per host
+OUTBOUND_RETRIES = int(os.getenv("OUTBOUND_RETRIES", "3"))              # attempts per request
+OUTBOUND_LATENCY_TARGET = float(os.getenv("OUTBOUND_LATENCY_TARGET", "8"))  # seconds; slower = back off
+BREAKER_FAILURES = int(os.getenv("OUTBOUND_BREAKER_FAILURES", "5"))     # consecutive failures to open
+BREAKER_COOLDOWN = float(os.getenv("OUTBOUND_BREAKER_COOLDOWN", "30"))  # seconds before a probe
+
+# Per-host overrides of {"rate", "max_concurrency"}
+HOST_LIMITS = {
+    "api.tavily.com": {"rate": 10.0, "max_concurrency": 16},
+    "maps.googleapis.com": {"rate": 40.0, "max_concurrency": 16},
+}
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class CircuitOpen(Exception):
+    """The host failed repeatedly; calls are refused until the cooldown passes."""
+
+
+class RetryableStatus(Exception):
+    def __init__(self, response: httpx.Response):
+        super().__init__(f"HTTP {response.status_code} from {response.request.url.host}")
+        self.response = response
+
+
+# =========================================================
+# Per-host state: token bucket + AIMD window + circuit breaker
+# =========================================================
+class HostScheduler:
+    def __init__(self, host: str, rate: float = OUTBOUND_RATE, max_concurrency: int = OUTBOUND_MAX_CONCURRENCY):
+        self.host = host
+        self.rate = rate
+        self.max_concurrency = max(1, max_concurrency)
+        self.window = float(min(4, self.max_concurrency))  # adaptive concurrency limit
+        self.in_flight = 0
+        self._tokens = max(1.0, rate)
+        self._refilled = time.monotonic()
+        self._paused_until = 0.0   # Retry-After
+        self._last_decrease = 0.0
+        self._cond = asyncio.Condition()
+        self.failures = 0          # consecutive
+        self.opened_at: Optional[float] = None
+        self.counts = {"ok": 0, "throttled": 0, "errors": 0, "rejected": 0}
+
+    # --- circuit breaker ---
+    def _check_breaker(self):
+        if self.opened_at is None:
+            return
+        if time.monotonic() - self.opened_at < BREAKER_COOLDOWN or self.in_flight:
+            self.counts["rejected"] += 1
+            raise CircuitOpen(f"circuit open for {self.host}")
+        # Half-open: let this one request probe the host
+
+    # --- admission ---
+    async def _acquire(self):
+        async with self._cond:
+            self._check_breaker()
+            await self._cond.wait_for(lambda: self.in_flight < int(self.window))
+            self.in_flight += 1
+        try:
+            await self._take_token()
+        except BaseException:
+            await self._release()
+            raise
+
+    async def _take_token(self):
+        while True:
+            now = time.monotonic()
+            self._tokens = min(max(1.0, self.rate), self._tokens + (now - self._refilled) * self.rate)
+            self._refilled = now
+            wait = self._paused_until - now
+            if wait <= 0 and self._tokens >= 1:
+                self._tokens -= 1
+                return
+            wait = max(wait, (1 - self._tokens) / self.rate)
+            await asyncio.sleep(wait + random.uniform(0, 0.05))
+
+    async def _release(self):
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    # --- feedback ---
+    def _on_success(self, latency: float):
+        self.counts["ok"] += 1
+        self.failures, self.opened_at = 0, None
+        if latency > OUTBOUND_LATENCY_TARGET:
+            self._decrease()
+        else:
+            # Additive increase: about +1 per window's worth of successes
+            self.window = min(self.max_concurrency, self.window + 1 / self.window)
+
+    def _on_failure(self, throttled: bool, retry_after: Optional[float] = None):
+        self.counts["throttled" if throttled else "errors"] += 1
+        self.failures += 1
+        self._decrease()
+        if retry_after:
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+        if self.failures >= BREAKER_FAILURES or self.opened_at is not None:
+            if self.opened_at is None:
+                print(f"🔌 Circuit opened for {self.host} after {self.failures} failures")
+            self.opened_at = time.monotonic()
+
+    def _decrease(self):
+        # Multiplicative decrease, at most once per second so one burst isn't counted n times
+        now = time.monotonic()
+        if now - self._last_decrease >= 1.0:
+            self.window = max(1.0, self.window / 2)
+            self._last_decrease = now
+
+    async def request(self, client: httpx.AsyncClient, method: str, url: str, **kwargs) -> httpx.Response:
+        await self._acquire()
+        started = time.monotonic()
+        try:
+            resp = await client.request(method, url, **kwargs)
+        except httpx.TransportError:
+            self._on_failure(throttled=False)
+            raise
+        finally:
+            await self._release()
+        if resp.status_code in RETRY_STATUSES:
+            self._on_failure(resp.status_code == 429, _retry_after(resp))
+            raise RetryableStatus(resp)
+        self._on_success(time.monotonic() - started)
+        return resp
+
+    def stats(self) -> dict:
+        state = "closed" if self.opened_at is None else "open"
+        return {"window": round(self.window, 1), "in_flight": self.in_flight, "circuit": state, **self.counts}
+
+
+def _retry_after(resp: httpx.Response) -> Optional[float]:
+    try:
+        return min(60.0, float(resp.headers.get("Retry-After", "")))
+    except ValueError:
+        return None
+
+
+def _retryable(e: BaseException) -> bool:
+    return isinstance(e, (httpx.TransportError, RetryableStatus))
+
+
+# =========================================================
+# Process-wide scheduler (one per event loop)
+# =========================================================
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_hosts: dict = {}
+
+
+def get_host(host: str) -> HostScheduler:
+    global _loop, _hosts
+    loop = asyncio.get_running_loop()
+    if loop is not _loop:
+        _loop, _hosts = loop, {}
+    if host not in _hosts:
+        _hosts[host] = HostScheduler(host, **HOST_LIMITS.get(host, {}))
+    return _hosts[host]
+
+
+async def request(client: httpx.AsyncClient, method: str, url: str,
+                  retries: int = OUTBOUND_RETRIES, **kwargs) -> httpx.Response:
+    """Send `method url` through its host's scheduler with jittered retries.
+
+    Raises CircuitOpen while the host is cut off. If every attempt hit a
+    429/5xx, the last such response is returned for the caller to handle.
+    """
+    host = get_host(urlsplit(url).hostname or "")
+    try:
+        async for attempt in AsyncRetrying(
+            stop=stop_after_attempt(max(1, retries)),
+            wait=wait_random_exponential(multiplier=0.5, max=8),
+            retry=retry_if_exception(_retryable),
+            reraise=True,
+        ):
+            with attempt:
+                return await host.request(client, method, url, **kwargs)
+    except RetryableStatus as e:
+        return e.response
+
+
+def stats() -> dict:
+    return {host: h.stats() for host, h in _hosts.items()}
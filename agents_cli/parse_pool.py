@@ -0,0 +1,29 @@
+from chunking import select_chunks
+from extractors import extract_rating
+from html_scan import scan_html
+from process_pool import run_in_pool, shutdown_parse_pool
+
+# =========================================================
+# Worker side (runs in child processes; args and results stay small)
+# =========================================================
+def parse_review_page(site: str, raw: bytes) -> dict:
+    """Raw page bytes → {"extracted", "aggregate_rating", "chunks", "chars"}.
+
+    `extracted` is the deterministic extractor hit (or None), `chunks` the
+    token-budgeted review text for the LLM fallback.
+    """
+    html = raw.decode("utf-8", errors="ignore")
+    scan = scan_html(html)
+    return {
+        "extracted": extract_rating(site, html, scan),
+        "aggregate_rating": scan["aggregate_rating"],
+        "chunks": select_chunks(scan["text"]),
+        "chars": len(html),
+    }
+
+
+# =========================================================
+# Async side (the pool itself lives in process_pool.py)
+# =========================================================
+async def parse_page(site: str, html: str) -> dict:
+    return await run_in_pool(parse_review_page, site, html.encode("utf-8"))
@@ -0,0 +1,45 @@
+import asyncio, os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+# =========================================================
+# Setup (stdlib only: the web backend loads this module too)
+# =========================================================
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", "0")) or (os.cpu_count() or 1)
+PARSE_POOL = os.getenv("PARSE_POOL", "1") != "0"  # 0 = parse inline (debugging)
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_parse_pool() -> Optional[ProcessPoolExecutor]:
+    """Process pool shared by every search in this process (created on first use)."""
+    global _pool
+    if PARSE_POOL and _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=PARSE_WORKERS)
+        print(f"🧮 HTML parse pool started ({PARSE_WORKERS} workers)")
+    return _pool
+
+
+def shutdown_parse_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+# =========================================================
+# Async side
+# =========================================================
+async def run_in_pool(fn, *args):
+    """Await `fn(*args)` in the parse pool; inline if the pool is off or has died."""
+    global _pool
+    pool = get_parse_pool()
+    if pool is None:
+        return fn(*args)
+    try:
+        return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+    except BrokenProcessPool as e:
+        print(f"⚠️ Parse pool crashed, restarting: {e}")
+        _pool = None
+        return fn(*args)
@@ -0,0 +1,70 @@
+import json, os, re, sqlite3, threading, time
+from typing import Optional
+
+# =========================================================
+# Setup
+# =========================================================
+REVIEW_CACHE_PATH = os.getenv("REVIEW_CACHE_PATH", "review_cache.sqlite3")
+REVIEW_CACHE_TTL = float(os.getenv("REVIEW_CACHE_TTL", str(7 * 24 * 3600)))  # seconds
+
+AGGREGATE_FIELDS = ("review_count", "sentiment", "avg_rating", "score")
+
+
+def provider_key(name: str, city: str) -> str:
+    """'Dr. Jane  Doe, MD' + 'Austin, TX' → 'dr jane doe md|austin tx'."""
+    def norm(text):
+        return re.sub(r"\s+", " ", re.sub(r"[^a-z0-9 ]", " ", (text or "").lower())).strip()
+    return f"{norm(name)}|{norm(city)}"
+
+
+class ReviewCache:
+    """Per-provider review aggregates from earlier analyses (no page text, just the numbers)."""
+
+    def __init__(self, path: str = REVIEW_CACHE_PATH, ttl: float = REVIEW_CACHE_TTL):
+        self.ttl = ttl
+        self.hits = self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS review_aggregates ("
+                " key TEXT PRIMARY KEY, aggregate TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    def get_many(self, keys: list) -> dict:
+        """{key: aggregate} for the fresh entries among `keys` (one query)."""
+        if not keys:
+            return {}
+        cutoff = time.time() - self.ttl
+        marks = ",".join("?" * len(keys))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT key, aggregate FROM review_aggregates WHERE updated_at >= ? AND key IN ({marks})",
+                (cutoff, *keys),
+            ).fetchall()
+        found = {key: json.loads(agg) for key, agg in rows}
+        self.hits += len(found)
+        self.misses += len(set(keys)) - len(found)
+        return found
+
+    def put(self, key: str, provider: dict):
+        aggregate = {f: provider.get(f) for f in AGGREGATE_FIELDS}
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO review_aggregates (key, aggregate, updated_at) VALUES (?, ?, ?)",
+                (key, json.dumps(aggregate), time.time()),
+            )
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+_cache: Optional[ReviewCache] = None
+
+
+def get_review_cache() -> ReviewCache:
+    global _cache
+    if _cache is None:
+        _cache = ReviewCache()
+    return _cache
@@ -0,0 +1,128 @@
+import asyncio, hashlib, os, re
+from typing import Optional
+import httpx
+from dotenv import load_dotenv
+import outbound
+from hedging import get_hedger
+
+load_dotenv()
+
+# =========================================================
+# Setup
+# =========================================================
+TAVILY_SEARCH_URL = "https://api.tavily.com/search"
+SITE_TIMEOUT = float(os.getenv("REVIEW_SITE_TIMEOUT", "20"))  # seconds per site
+FETCH_TIMEOUT = 15.0
+MIN_HTML_CHARS = 1000
+
+SITE_DOMAINS = [
+    "healthgrades.com/physician",
+    "vitals.com/doctors",
+    "ratemds.com/doctor-ratings",
+]
+
+BROWSER_UA = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/122.0.0.0 Safari/537.36"
+)
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the process-wide async HTTP client (created lazily)."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=FETCH_TIMEOUT,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+        )
+    return _client
+
+
+async def close_http_client():
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+
+
+# =========================================================
+# Tavily search + direct fallback download
+# (all traffic goes through outbound's per-host scheduler)
+# =========================================================
+async def tavily_search(query: str, **params) -> dict:
+    """Tavily /search over the shared client (same payload as TavilyClient.search)."""
+    # Searches are idempotent, so a slow one may be hedged (HEDGING=1)
+    resp = await get_hedger("tavily").run(lambda: outbound.request(
+        get_http_client(), "POST", TAVILY_SEARCH_URL,
+        json={"query": query, **params},
+        headers={"Authorization": f"Bearer {os.getenv('TAVILY_API_KEY')}"},
+    ))
+    resp.raise_for_status()
+    return resp.json()
+
+
+def pick_result(results: list, site: str) -> dict:
+    """Prefer a result hosted on the review site itself, else the top hit."""
+    prefixes = (f"https://www.{site}", f"http://www.{site}", f"https://{site}")
+    return next((r for r in results if r.get("url", "").startswith(prefixes)), results[0])
+
+
+async def fetch_site(name, city, specialty, site) -> Optional[tuple]:
+    """Search one review site for a doctor; return (url, raw) or None."""
+    query = f"{name}, {city}, {specialty} site:{site}"
+    print(f"🔍 Searching {site}...")
+    resp = await tavily_search(query, include_raw_content=True, max_results=10)
+
+    if not resp.get("results"):
+        print(f"  ⚠️ No results for {site}")
+        return None
+
+    result = pick_result(resp["results"], site)
+    url = result.get("url", "")
+    raw = result.get("raw_content") or result.get("content", "")
+
+    if not raw and url:
+        print(f"  ⚠️ Tavily missing content, fetching directly from {url}")
+        r = await outbound.request(get_http_client(), "GET", url, headers={"User-Agent": BROWSER_UA})
+        if r.status_code == 200 and len(r.text) > MIN_HTML_CHARS:
+            raw = r.text
+        else:
+            print(f"  ❌ Fallback fetch failed ({r.status_code})")
+            return None
+
+    if not raw:
+        print(f"  ⚠️ No usable HTML from {site}")
+        return None
+    return url, raw
+
+
+async def fetch_review_pages(name, city, specialty, site_timeout: float = SITE_TIMEOUT) -> dict:
+    """Query every review site at once; return {site: (url, raw)} in SITE_DOMAINS order."""
+
+    async def guarded(site):
+        try:
+            return await asyncio.wait_for(fetch_site(name, city, specialty, site), timeout=site_timeout)
+        except asyncio.TimeoutError:
+            print(f"  ⏱️ {site} timed out after {site_timeout:.0f}s")
+        except Exception as e:
+            print(f"  ❌ Error while fetching {site}: {e}")
+        return None
+
+    results = await asyncio.gather(*(guarded(site) for site in SITE_DOMAINS))
+    return {site: res for site, res in zip(SITE_DOMAINS, results) if res}
+
+
+def save_review_page(name: str, site: str, url: str, raw: str) -> str:
+    """Write a fetched page under doctor_pages/ and return the file name."""
+    os.makedirs("doctor_pages", exist_ok=True)
+    hash_id = hashlib.sha256(url.encode()).hexdigest()[:8]
+    safe_site = site.replace("/", "_").replace(":", "_")
+    safe_name = re.sub(r"[^A-Za-z0-9 _.-]", "", name)
+    filename = f"doctor_pages/{safe_name}_{safe_site}_{hash_id}.html"
+    with open(filename, "w", encoding="utf-8") as f:
+        f.write(raw)
+    return filename
@@ -1,35 +1,89 @@
-import math, re
+import json, math, re
 from typing import Optional
-from models import get_nemotron
+import numpy as np
+from lexicon import normalize_term
+from llm_gateway import complete, complete_many
 
-llm = get_nemotron()
+ALIGNMENT_MULTIPLIERS = {"YES": 1.10, "MAYBE": 1.05, "NO": 1.0}
 
 # -----------------------------
 # Alignment reward computation
 # -----------------------------
-def compute_alignment_reward(specialty: str, symptom: Optional[str]) -> float:
-    """Use LLM to check if specialty fits the symptom; return multiplier."""
-    if not symptom:
-        return 1.0
-    prompt = f"""
+def alignment_prompt(specialty: str, symptom: str) -> str:
+    return f"""
 You are a medical expert.
 Is the specialty "{specialty}" appropriate for treating or diagnosing the symptom/disease "{symptom}"?
 Answer with one word only: YES, MAYBE, or NO.
 """
+
+
+async def compute_alignment_reward(specialty: str, symptom: Optional[str]) -> float:
+    """Use LLM to check if specialty fits the symptom; return multiplier."""
+    if not symptom:
+        return 1.0
     try:
-        resp = llm.invoke(prompt)
-        answer = resp.content.strip().upper() if hasattr(resp, "content") else str(resp).upper()
-        if answer.startswith("YES"):
-            return 1.10
-        elif answer.startswith("MAYBE"):
-            return 1.05
-        else:
-            return 1.0
+        return alignment_multiplier(await complete(alignment_prompt(specialty, symptom)))
     except Exception as e:
         print(f"⚠️ Alignment check failed for {specialty}: {e}")
         return 1.0
 
 
+def alignment_multiplier(answer: str) -> float:
+    """Map a YES/MAYBE/NO answer to its score multiplier."""
+    answer = answer.strip().upper()
+    if answer.startswith("YES"):
+        return ALIGNMENT_MULTIPLIERS["YES"]
+    elif answer.startswith("MAYBE"):
+        return ALIGNMENT_MULTIPLIERS["MAYBE"]
+    return ALIGNMENT_MULTIPLIERS["NO"]
+
+
+async def resolve_alignments(specialties, symptom: Optional[str]) -> dict:
+    """Resolve each distinct specialty against the symptom in one batched prompt.
+
+    Specialties the batched answer does not cover fall back to single-specialty
+    checks sent as one gateway batch. Returns {specialty: multiplier}.
+    """
+    distinct = list(dict.fromkeys(s for s in specialties if s))
+    if not symptom or not distinct:
+        return {s: 1.0 for s in distinct}
+    if len(distinct) == 1:
+        return {distinct[0]: await compute_alignment_reward(distinct[0], symptom)}
+
+    numbered = "\n".join(f"{i}. {s}" for i, s in enumerate(distinct, start=1))
+    prompt = f"""
+You are a medical expert.
+For each specialty below, is it appropriate for treating or diagnosing the symptom/disease "{symptom}"?
+
+{numbered}
+
+Return only JSON mapping each number to one word — YES, MAYBE, or NO:
+{{"1": "YES", "2": "NO"}}
+"""
+    resolved = {}
+    try:
+        text = await complete(prompt)
+        match = re.search(r"\{.*\}", text, re.S)
+        answers = json.loads(match.group(0)) if match else {}
+        for key, answer in answers.items():
+            idx = int(key) - 1
+            if 0 <= idx < len(distinct) and isinstance(answer, str):
+                resolved[distinct[idx]] = alignment_multiplier(answer)
+    except Exception as e:
+        print(f"⚠️ Batched alignment check failed: {e}")
+
+    missing = [s for s in distinct if s not in resolved]
+    if missing:
+        answers = await complete_many([alignment_prompt(s, symptom) for s in missing], return_exceptions=True)
+        for s, answer in zip(missing, answers):
+            if isinstance(answer, Exception):
+                print(f"⚠️ Alignment check failed for {s}: {answer}")
+                resolved[s] = 1.0
+            else:
+                resolved[s] = alignment_multiplier(answer)
+    return resolved
+
+
 # -----------------------------
 # Distance extraction helper
 # -----------------------------
@@ -59,48 +113,161 @@ def distance_penalty(distance: float) -> float:
 
 
 # -----------------------------
-# Composite scoring
+# Vectorized scoring
 # -----------------------------
-def compute_final_scores(providers, summaries, symptom: Optional[str] = None):
-    """Combine sentiment, review volume, distance, and alignment into final score."""
-    results = []
-    for p in providers:
-        s = next((x for x in summaries if x["name"] == p["Name"]), None)
-        if not s:
-            continue
+def distance_penalties(distances: np.ndarray) -> np.ndarray:
+    """Array form of distance_penalty()."""
+    linear = np.round(10 - ((distances - 10) / 20) * 10, 2)
+    return np.where(distances <= 10, 10.0, np.where(distances <= 30, linear, 0.0))
+
 
-        sentiment = s["sentiment"]
-        reviews = s["review_count"]
-        distance = extract_distance(p["Address"]) or 10.0  # Default 10mi if missing
+def composite_scores(sentiment, reviews, distances, alignment):
+    """Return (final, review_score, distance_score) arrays for one ranking pass."""
+    # Normalized review score (logarithmic scaling)
+    review_score = np.minimum(1, np.log1p(reviews) / math.log(1 + 50)) * 10
+    # Distance score (flat under 10mi, penalty beyond)
+    distance_score = distance_penalties(distances)
+    # Weighted composite with alignment multiplier
+    base_score = 0.5 * sentiment + 0.3 * review_score + 0.2 * distance_score
+    return np.round(base_score * alignment, 2), review_score, distance_score
 
-        # Normalized review score (logarithmic scaling)
-        review_score = min(1, math.log(1 + reviews) / math.log(1 + 50)) * 10
 
-        # New distance score (flat under 10mi, penalty beyond)
-        distance_score = distance_penalty(distance)
+def top_k_indices(scores: np.ndarray, k: Optional[int] = None) -> np.ndarray:
+    """Indices of the k best scores, highest first; ties keep input order."""
+    n = len(scores)
+    k = n if k is None else min(k, n)
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    idx = np.argpartition(-scores, k - 1)[:k] if k < n else np.arange(n)
+    return idx[np.lexsort((idx, -scores[idx]))]
 
-        # Weighted composite
-        base_score = 0.5 * sentiment + 0.3 * review_score + 0.2 * distance_score
 
-        # Add alignment multiplier
-        align_multiplier = compute_alignment_reward(p["Specialty"], symptom)
-        final_score = round(base_score * align_multiplier, 2)
+# -----------------------------
+# Zero-cost prescoring (no searches, no LLM)
+# -----------------------------
+PRIOR_SENTIMENT = 7.0   # assumed sentiment for providers with no cached reviews
+PRIOR_REVIEWS = 10.0    # assumed review count for the same
+MAX_REVIEWS_SCORED = 50.0  # review_score saturates here (see composite_scores)
+SPECIALTY_STOP_WORDS = {"and", "of", "the", "&", "/"}
+
+
+def specialty_match(provider_specialty: Optional[str], requested: Optional[str]) -> float:
+    """1.0 for the requested specialty, 0.5 if they share a word, else 0.0 (string test only).
+
+    Qualifiers such as "medicine" count, so "Internal Medicine" / "Family Medicine" is a 0.5.
+    """
+    a = set(normalize_term(provider_specialty or "").split()) - SPECIALTY_STOP_WORDS
+    b = set(normalize_term(requested or "").split()) - SPECIALTY_STOP_WORDS
+    if not a or not b:
+        return 0.0
+    if a <= b or b <= a:
+        return 1.0
+    return 0.5 if a & b else 0.0
+
 
-        results.append({
-            "Name": p["Name"],
-            "FinalScore": final_score,
-            "Sentiment": sentiment,
-            "Reviews": reviews,
-            "Distance(mi)": distance,
-            "DistanceScore": distance_score,
-            "AlignmentBonus": align_multiplier,
-        })
+def prescore(providers, specialty: Optional[str], cached: list):
+    """(estimate, upper) arrays for every provider, from data already in hand.
+
+    Uses distance, specialty match, the pediatric multiplier set by find_providers
+    and cached review aggregates (None where there is none). `upper` bounds the
+    score full analysis could still reach, so candidates below the current top-k
+    can be dropped without changing it.
+    """
+    n = len(providers)
+    distances = np.fromiter(
+        (extract_distance(p.get("Address", "")) or 10.0 for p in providers), dtype=float, count=n
+    )
+    match = np.fromiter((specialty_match(p.get("Specialty"), specialty) for p in providers), dtype=float, count=n)
+    pediatric = np.fromiter((float(p.get("alignment_multiplier", 1.0)) for p in providers), dtype=float, count=n)
+    known = np.array([c is not None for c in cached], dtype=bool)
+    sentiment = np.array([float(c.get("sentiment") or 0.0) if c else 0.0 for c in cached])
+    reviews = np.array([float(c.get("review_count") or 0.0) if c else 0.0 for c in cached])
 
-    ranked = sorted(results, key=lambda x: x["FinalScore"], reverse=True)
+    alignment_est = np.where(match >= 1, ALIGNMENT_MULTIPLIERS["YES"],
+                             np.where(match > 0, ALIGNMENT_MULTIPLIERS["MAYBE"], ALIGNMENT_MULTIPLIERS["NO"]))
+    estimate, _, _ = composite_scores(
+        np.where(known, sentiment, PRIOR_SENTIMENT), np.where(known, reviews, PRIOR_REVIEWS),
+        distances, alignment_est,
+    )
+    upper, _, _ = composite_scores(
+        np.where(known, sentiment, 10.0), np.where(known, reviews, MAX_REVIEWS_SCORED),
+        distances, max(ALIGNMENT_MULTIPLIERS.values()),
+    )
+    return estimate * pediatric, upper * np.maximum(pediatric, 1.0)
 
-    # Pretty-print results
+
+def rank_providers(providers, summaries, symptom: Optional[str] = None, top_k: Optional[int] = None,
+                   alignments: Optional[dict] = None):
+    """Combine sentiment, review volume, distance, and alignment into a ranked list (no printing).
+
+    `alignments` is {specialty: multiplier} from resolve_alignments(); missing
+    specialties count as 1.0, so provisional rankings can pass {}.
+    """
+    by_name = {}
+    for x in summaries:
+        by_name.setdefault(x["name"], x)
+    matched = [(p, by_name[p["Name"]]) for p in providers if p["Name"] in by_name]
+    if not matched:
+        return []
+
+    alignments = alignments or {}
+
+    n = len(matched)
+    sentiment = np.fromiter((s["sentiment"] for _, s in matched), dtype=float, count=n)
+    reviews = np.fromiter((s["review_count"] for _, s in matched), dtype=float, count=n)
+    distances = np.fromiter(
+        (extract_distance(p["Address"]) or 10.0 for p, _ in matched),  # Default 10mi if missing
+        dtype=float, count=n,
+    )
+    alignment = np.fromiter((alignments.get(p["Specialty"], 1.0) for p, _ in matched), dtype=float, count=n)
+
+    final, _, distance_score = composite_scores(sentiment, reviews, distances, alignment)
+
+    return [
+        {
+            "Name": matched[i][0]["Name"],
+            "FinalScore": float(final[i]),
+            "Sentiment": matched[i][1]["sentiment"],
+            "Reviews": matched[i][1]["review_count"],
+            "Distance(mi)": float(distances[i]),
+            "DistanceScore": float(distance_score[i]),
+            "AlignmentBonus": float(alignment[i]),
+            "Partial": False,
+        }
+        for i in top_k_indices(final, top_k)
+    ]
+
+
+def rank_partial(providers, alignments: Optional[dict] = None):
+    """Rank providers whose reviews were never analyzed (deadline hit) by distance alone."""
+    if not providers:
+        return []
+    alignments = alignments or {}
+    distances = np.fromiter(
+        (extract_distance(p.get("Address", "")) or 10.0 for p in providers), dtype=float, count=len(providers)
+    )
+    distance_score = distance_penalties(distances)
+    return [
+        {
+            "Name": providers[i].get("Name") or providers[i].get("name"),
+            "FinalScore": float(distance_score[i]),
+            "Sentiment": None,
+            "Reviews": None,
+            "Distance(mi)": float(distances[i]),
+            "DistanceScore": float(distance_score[i]),
+            "AlignmentBonus": alignments.get(providers[i].get("Specialty"), 1.0),
+            "Partial": True,
+        }
+        for i in top_k_indices(distance_score)
+    ]
+
+
+def print_ranking(ranked):
     print("\n🏁 Final Doctor Ranking (with alignment & distance penalty):\n")
     for i, r in enumerate(ranked, 1):
+        if r.get("Partial"):
+            print(f"{i}. {r['Name']} — partial, distance only ({r['Distance(mi)']} mi, score {r['FinalScore']})")
+            continue
         bonus = f" (x{r['AlignmentBonus']})" if r['AlignmentBonus'] > 1 else ""
         print(
             f"{i}. {r['Name']} — Score {r['FinalScore']}{bonus} "
@@ -109,4 +276,15 @@ def compute_final_scores(providers, summaries, symptom: Optional[str] = None):
         )
     print("=" * 70)
 
+
+# -----------------------------
+# Composite scoring
+# -----------------------------
+async def compute_final_scores(providers, summaries, symptom: Optional[str] = None, top_k: Optional[int] = None):
+    """Rank providers (optionally only the top_k) and pretty-print the result."""
+    # One alignment round trip per ranking pass, shared by providers with the same specialty
+    names = {s["name"] for s in summaries}
+    alignments = await resolve_alignments([p["Specialty"] for p in providers if p["Name"] in names], symptom)
+    ranked = rank_providers(providers, summaries, symptom=symptom, top_k=top_k, alignments=alignments)
+    print_ranking(ranked)
     return ranked
@@ -0,0 +1,179 @@
+import json, os, threading, time, zlib
+from typing import Optional
+import numpy as np
+from lexicon import normalize_term
+
+# =========================================================
+# Setup
+# =========================================================
+SEMANTIC_CACHE_PATH = os.getenv("SEMANTIC_CACHE_PATH", "symptom_cache.npz")
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.75"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "2000"))
+EMBED_DIM = 1024
+
+
+# =========================================================
+# Local embedding (word stems + their char n-grams)
+# =========================================================
+STOPWORDS = {normalize_term(w) for w in (
+    "a an and the of on in at to for with my me i im have has had having is am are was be been "
+    "when while during after before every each some very really bad lot feel feeling get getting "
+    "got it its this that there since day days week weeks up down can cant cannot t dont don"
+).split()}
+# Words shared by most complaints carry little signal about the specialty
+GENERIC_WORDS = {normalize_term(w) for w in (
+    "pain ache hurt hurts hurting sore problem issue trouble difficulty unable hard"
+).split()}
+# Irregular forms the suffix stripper can't reach
+WORD_FORMS = {"swollen": "swell", "insomnia": "sleep", "sleepless": "sleep", "nauseous": "nausea",
+              "breathless": "breath", "breathe": "breath", "breathing": "breath"}
+STEM_SUFFIXES = ("ness", "ing", "ed", "ly")
+EMBED_VERSION = 2  # bump when embed() changes; stored vectors are re-embedded on load
+
+
+def stem(word: str) -> str:
+    """Crude suffix stripper: 'numbness' → 'numb', 'sleeping' → 'sleep', 'dizziness' → 'dizzy'."""
+    word = normalize_term(word)
+    if word in WORD_FORMS:
+        return WORD_FORMS[word]
+    for suffix in STEM_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[:-len(suffix)]
+            if len(word) > 3 and word[-1] == word[-2] and word[-1] not in "lsz":
+                word = word[:-1]  # 'running' → 'runn' → 'run'
+            break
+    return word[:-1] + "y" if word.endswith("i") else word
+
+
+def embed(text: str, dim: int = EMBED_DIM) -> np.ndarray:
+    """L2-normalized hashed bag of word stems and their char 3-grams (log-scaled).
+
+    Stems carry most of the weight, so paraphrases ("numbness in fingers" /
+    "numb fingers") match; the n-grams still catch typos.
+    """
+    features, weights = [], []
+    for word in normalize_term(text).split():
+        if word in STOPWORDS:
+            continue
+        scale = 0.25 if word in GENERIC_WORDS else 1.0
+        word = stem(word)
+        padded = f"<{word}>"
+        for i in range(len(padded) - 2):
+            features.append(padded[i:i + 3])
+            weights.append(0.5 * scale)
+        features.append(f"w:{word}")
+        weights.append(4 * scale)
+
+    vec = np.zeros(dim, dtype=np.float32)
+    if not features:
+        return vec
+    idx = np.fromiter((zlib.crc32(f.encode()) % dim for f in features), dtype=np.int64, count=len(features))
+    np.add.at(vec, idx, np.asarray(weights, dtype=np.float32))
+    np.log1p(vec, out=vec)
+    n = np.linalg.norm(vec)
+    return vec / n if n else vec
+
+
+def segment_key(age: Optional[int], sex: Optional[str]) -> str:
+    """Cache segment: age bracket + sex, so a child's symptom never reuses an adult answer."""
+    age = age if age is not None else 30
+    if age < 16:
+        bracket = "child"
+    elif age < 40:
+        bracket = "adult"
+    elif age < 65:
+        bracket = "middle"
+    else:
+        bracket = "senior"
+    return f"{bracket}|{(sex or 'unknown').lower()}"
+
+
+# =========================================================
+# Cache
+# =========================================================
+class SemanticCache:
+    """Symptom text → specialty, matched by cosine similarity within a segment."""
+
+    def __init__(self, path: str = SEMANTIC_CACHE_PATH, threshold: float = SEMANTIC_CACHE_THRESHOLD,
+                 max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES, dim: int = EMBED_DIM):
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.dim = dim
+        self.hits = self.misses = 0
+        self._lock = threading.Lock()
+        self.vectors = np.zeros((0, dim), dtype=np.float32)
+        self.last_used = np.zeros(0, dtype=np.float64)
+        self.texts, self.specialties, self.segments = [], [], []
+        self.load()
+
+    def lookup(self, text: str, age: Optional[int], sex: Optional[str]) -> Optional[str]:
+        seg = segment_key(age, sex)
+        with self._lock:
+            rows = [i for i, s in enumerate(self.segments) if s == seg]
+            if rows:
+                sims = self.vectors[rows] @ embed(text, self.dim)
+                best = int(np.argmax(sims))
+                if sims[best] >= self.threshold:
+                    row = rows[best]
+                    self.last_used[row] = time.time()
+                    self.hits += 1
+                    return self.specialties[row]
+            self.misses += 1
+            return None
+
+    def add(self, text: str, age: Optional[int], sex: Optional[str], specialty: str):
+        vec = embed(text, self.dim)
+        with self._lock:
+            if len(self.texts) >= self.max_entries:
+                # Evict the least recently used entry
+                old = int(np.argmin(self.last_used))
+                self.vectors[old] = vec
+                self.last_used[old] = time.time()
+                self.texts[old], self.specialties[old] = text, specialty
+                self.segments[old] = segment_key(age, sex)
+                return
+            self.vectors = np.vstack([self.vectors, vec[None, :]])
+            self.last_used = np.append(self.last_used, time.time())
+            self.texts.append(text)
+            self.specialties.append(specialty)
+            self.segments.append(segment_key(age, sex))
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                meta = json.loads(str(data["meta"]))
+                vectors = data["vectors"].astype(np.float32)
+                last_used = data["last_used"].astype(np.float64)
+            if vectors.shape[1] != self.dim:
+                print(f"⚠️ Ignoring {self.path}: embedding size changed")
+                return
+            if meta.get("embed_version") != EMBED_VERSION and meta["texts"]:
+                vectors = np.stack([embed(t, self.dim) for t in meta["texts"]])  # saved by an older embed()
+            keep = np.argsort(-last_used)[: self.max_entries]
+            self.vectors, self.last_used = vectors[keep], last_used[keep]
+            self.texts = [meta["texts"][i] for i in keep]
+            self.specialties = [meta["specialties"][i] for i in keep]
+            self.segments = [meta["segments"][i] for i in keep]
+        except Exception as e:
+            print(f"⚠️ Could not load semantic cache {self.path}: {e}")
+
+    def save(self):
+        with self._lock:
+            meta = json.dumps({"texts": self.texts, "specialties": self.specialties, "segments": self.segments,
+                               "embed_version": EMBED_VERSION})
+            tmp = f"{self.path}.tmp.npz"
+            np.savez_compressed(tmp, vectors=self.vectors.astype(np.float16),
+                                last_used=self.last_used, meta=np.array(meta))
+            os.replace(tmp, self.path)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self.texts),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+        }
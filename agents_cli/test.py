@@ -1,11 +1,11 @@
-import asyncio, os, csv, re, glob, hashlib, json, requests
+import asyncio, os, csv, re, glob, json
 from typing import TypedDict, Optional
-from bs4 import BeautifulSoup
 from langgraph.graph import StateGraph, START, END
 from dotenv import load_dotenv
-from tavily import TavilyClient
 from utils.bcbs_scraper import get_bcbs_providers_live
-from models import get_nemotron
+from llm_gateway import complete
+from review_fetcher import fetch_review_pages, save_review_page
+from parse_pool import parse_page
 from scoring import compute_final_scores
 from utils.utils import city_state_from_zip
 from utils.utils import cleanup_temp_data
@@ -16,8 +16,6 @@ import json, re
 # Setup
 # =========================================================
 load_dotenv()
-tavily = TavilyClient(api_key=os.getenv("TAVILY_API_KEY"))
-llm = get_nemotron()
 
 MAX_PROVIDERS = 7
 MAX_CHARS = 200000
@@ -44,7 +42,7 @@ class GraphState(TypedDict):
 # =========================================================
 # Helper: LLM reasoning
 # =========================================================
-def get_specialty_from_symptom(symptom_description: str, age: int, gender: str) -> str:
+async def get_specialty_from_symptom(symptom_description: str, age: int, gender: str) -> str:
     pediatric_note = "The patient is a child (under 16)." if age < 16 else "The patient is an adult."
     prompt = f"""
     You are a medical triage assistant.
@@ -60,8 +58,7 @@ def get_specialty_from_symptom(symptom_description: str, age: int, gender: str)
     {{"recommended": "specialty"}}
     """
     try:
-        resp = llm.invoke(prompt)
-        text = resp.content.strip() if hasattr(resp, "content") else str(resp)
+        text = (await complete(prompt)).strip()
         match = re.search(r'"recommended"\s*:\s*"([^"]+)"', text)
         if match:
             return match.group(1).strip()
@@ -70,11 +67,10 @@ def get_specialty_from_symptom(symptom_description: str, age: int, gender: str)
     return "Internal Medicine"
 
 
-def is_specialty_term(user_input: str) -> bool:
+async def is_specialty_term(user_input: str) -> bool:
     prompt = f'Is "{user_input}" a valid medical specialty? Answer only YES or NO.'
     try:
-        resp = llm.invoke(prompt)
-        text = resp.content.strip().upper() if hasattr(resp, "content") else str(resp).upper()
+        text = (await complete(prompt)).strip().upper()
         return text.startswith("YES")
     except Exception as e:
         print(f"⚠️ Error checking specialty: {e}")
@@ -99,10 +95,10 @@ async def get_user_info(state: GraphState):
     state["gender"] = gender
     state["is_pediatric"] = age < 16
 
-    if is_specialty_term(user_input):
+    if await is_specialty_term(user_input):
         state["specialty"] = user_input
     else:
-        state["specialty"] = get_specialty_from_symptom(user_input, age, gender)
+        state["specialty"] = await get_specialty_from_symptom(user_input, age, gender)
 
     insurance = input("🏥 Enter your insurance provider (currently only BCBS supported): ").strip()
     state["insurance"] = insurance
@@ -180,104 +176,31 @@ async def find_providers(state: GraphState):
 # =========================================================
 # Step 3: Fetch & Save HTML
 # =========================================================
-def fetch_jsonld_rating(html: str):
-    """Extract rating and review count from JSON-LD blocks, if present."""
-    try:
-        soup = BeautifulSoup(html, "html.parser")
-        for tag in soup.find_all("script", {"type": "application/ld+json"}):
-            try:
-                data = json.loads(tag.text)
-                if isinstance(data, dict) and "aggregateRating" in data:
-                    agg = data["aggregateRating"]
-                    rating = float(agg.get("ratingValue", 0.0))
-                    reviews = int(agg.get("reviewCount", 0))
-                    if rating or reviews:
-                        return {"rating": rating, "reviews": reviews}
-            except Exception:
-                continue
-    except Exception:
-        pass
-    return None
-
-
-def fetch_reviews(name, city, specialty):
+async def fetch_reviews(name, city, specialty):
     print(f"\n🌐 Fetching review pages for {name} — {specialty}, {city}")
-    os.makedirs("doctor_pages", exist_ok=True)
     pages = {}
 
-    site_domains = [
-        "healthgrades.com/physician",
-        "vitals.com/doctors",
-        "ratemds.com/doctor-ratings",
-    ]
-
-    for site in site_domains:
-        try:
-            query = f"{name}, {city}, {specialty} site:{site}"
-            print(f"🔍 Searching {site}...")
-            resp = tavily.search(query=query, include_raw_content=True, max_results=10)
-
-            if not resp.get("results"):
-                print(f"  ⚠️ No results for {site}")
-                continue
-
-            result = next(
-                (r for r in resp["results"]
-                 if r.get("url", "").startswith(f"https://www.{site}")
-                 or r.get("url", "").startswith(f"http://www.{site}")
-                 or r.get("url", "").startswith(f"https://{site}")),
-                resp["results"][0]
-            )
-
-            url = result.get("url", "")
-            raw = result.get("raw_content") or result.get("content", "")
-
-            # Fallback static fetch if Tavily lacks raw content
-            if not raw and url:
-                print(f"  ⚠️ Tavily missing content, fetching directly from {url}")
-                r = requests.get(
-                    url,
-                    headers={
-                        "User-Agent": (
-                            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                            "AppleWebKit/537.36 (KHTML, like Gecko) "
-                            "Chrome/122.0.0.0 Safari/537.36"
-                        )
-                    },
-                    timeout=15,
-                )
-                if r.status_code == 200 and len(r.text) > 1000:
-                    raw = r.text
-                else:
-                    print(f"  ❌ Fallback fetch failed ({r.status_code})")
-                    continue
-
-            # --- Primary: JSON-LD fast parse ---
-            jsonld_data = fetch_jsonld_rating(raw) if raw else None
-            if jsonld_data and jsonld_data["reviews"] > 0:
-                print(f"  ⚡ Found JSON-LD rating: "
-                      f"{jsonld_data['rating']}/5 from {jsonld_data['reviews']} reviews")
-            elif raw:
-                # --- Secondary: fallback to regex/LLM analysis if JSON-LD is empty ---
-                print("  🔁 JSON-LD missing or zero; will rely on LLM extraction later.")
-
-            # Save HTML snapshot for LLM fallback regardless
-            if raw:
-                hash_id = hashlib.sha256(url.encode()).hexdigest()[:8]
-                safe_site = site.replace("/", "_").replace(":", "_")
-                safe_name = re.sub(r"[^A-Za-z0-9 _.-]", "", name)
-                filename = f"doctor_pages/{safe_name}_{safe_site}_{hash_id}.html"
-                with open(filename, "w", encoding="utf-8") as f:
-                    f.write(raw)
-                print(f"  💾 Saved HTML from {site} to {filename}")
-                pages[site] = {
-                    "html": raw[:MAX_CHARS],
-                    "jsonld": jsonld_data or {"reviews": 0, "rating": 0.0}
-                }
-
-        except Exception as e:
-            print(f"  ❌ Error while fetching {site}: {e}")
-            continue
+    # All sites (and any fallback downloads) are fetched concurrently
+    fetched = await fetch_review_pages(name, city, specialty)
+    # --- Primary: JSON-LD fast parse (all pages at once in the process pool; also yields the review chunks) ---
+    parsed_pages = await asyncio.gather(*(parse_page(site, raw) for site, (url, raw) in fetched.items()))
+    for (site, (url, raw)), parsed in zip(fetched.items(), parsed_pages):
+        jsonld_data = parsed["aggregate_rating"]
+        if jsonld_data and jsonld_data["reviews"] > 0:
+            print(f"  ⚡ Found JSON-LD rating on {site}: "
+                  f"{jsonld_data['rating']}/5 from {jsonld_data['reviews']} reviews")
+        else:
+            # --- Secondary: fallback to regex/LLM analysis if JSON-LD is empty ---
+            print(f"  🔁 JSON-LD missing or zero on {site}; will rely on LLM extraction later.")
+
+        # Save HTML snapshot for LLM fallback regardless
+        filename = save_review_page(name, site, url, raw)
+        print(f"  💾 Saved HTML from {site} to {filename}")
+        pages[site] = {
+            "html": raw[:MAX_CHARS],
+            "chunks": parsed["chunks"],
+            "jsonld": jsonld_data or {"reviews": 0, "rating": 0.0}
+        }
 
     if not pages:
         print("  ❌ No usable pages found across all sites.")
@@ -286,28 +209,7 @@ def fetch_reviews(name, city, specialty):
 # =========================================================
 # Step 4: LLM-based review extraction
 # =========================================================
-def extract_relevant_chunks(html: str) -> str:
-    soup = BeautifulSoup(html, "html.parser")
-    text = soup.get_text(" ", strip=True)
-    matches = re.findall(
-        r"((?:\d(?:\.\d)?)\s*(?:Star|Rating|ratings?)|based on\s*\d+\s*(?:reviews|ratings)|\d+\s*(?:patient\s+)?reviews?)",
-        text,
-        re.I,
-    )
-    if matches:
-        chunks = []
-        for m in matches:
-            idx = text.lower().find(m.lower())
-            if idx != -1:
-                start = max(0, idx - 40)
-                end = min(len(text), idx + 80)
-                chunks.append(text[start:end])
-        return " ... ".join(chunks)
-    return text[:8000]
-
-
-def llm_extract_review_data(html_content: str, site: str, name: str) -> dict:
-    text = extract_relevant_chunks(html_content)
+async def llm_extract_review_data(text: str, site: str, name: str) -> dict:
     prompt = f"""
 You are reading reviews for {name} from {site}.
 Extract three numbers:
@@ -322,8 +224,7 @@ Text:
 {text}
 """
     try:
-        resp = llm.invoke(prompt)
-        text_out = resp.content if hasattr(resp, "content") else str(resp)
+        text_out = await complete(prompt)
         print(f"      🧩 Raw LLM output from {site}:\n{text_out}\n")
         # Extract *only* the first valid JSON-like object
         match = re.search(r"\{[^{}]+\}", text_out, re.S)
@@ -354,7 +255,7 @@ Text:
 # Step 5: Doctor-level reasoning
 # =========================================================
 async def rag_analyze_doctor(name, specialty, city, symptom):
-    pages = fetch_reviews(name, city, specialty)
+    pages = await fetch_reviews(name, city, specialty)
     if not pages:
         return f"❌ No review pages found for {name}."
 
@@ -364,7 +265,6 @@ async def rag_analyze_doctor(name, specialty, city, symptom):
     site_lines = []
 
     for site, payload in pages.items():
-        html = payload["html"]
         jsonld = payload.get("jsonld", {"reviews": 0, "rating": 0.0})
         num, site_rating = jsonld["reviews"], jsonld["rating"]
         sentiment_score = 5.0  # default midscore
@@ -372,7 +272,7 @@ async def rag_analyze_doctor(name, specialty, city, symptom):
         # ✅ If JSON-LD found no reviews, run LLM fallback
         if num == 0:
             print(f"   ⚙️ Running LLM fallback for {site} (no JSON-LD data)")
-            data = llm_extract_review_data(html, site, name)
+            data = await llm_extract_review_data(payload["chunks"], site, name)
             num, site_rating, sentiment_score = (
                 data["reviews"], data["rating"], data["sentiment"]
             )
@@ -434,7 +334,7 @@ async def analyze_and_score(state: GraphState):
         if "Name" in p and "name" not in p:
             p["name"] = p["Name"]
 
-    ranked = compute_final_scores(providers, summaries, symptom=state["symptom"])
+    ranked = await compute_final_scores(providers, summaries, symptom=state["symptom"])
     cleanup_temp_data()
     return state
 
@@ -0,0 +1,4 @@
+import os, sys
+
+# agents_cli modules import each other as top-level modules (`from scoring import ...`)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
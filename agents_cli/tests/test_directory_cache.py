@@ -0,0 +1,46 @@
+import asyncio
+import threading
+
+import directory_cache
+from directory_cache import DirectoryCache, cached_providers
+
+
+def test_empty_results_are_not_cached(tmp_path):
+    cache = DirectoryCache(str(tmp_path / "cache.sqlite3"))
+    cache.put("k", [])
+    assert cache.get("k") is None
+    cache.put("k", [{"name": "Dr. A"}])
+    assert cache.get("k") == ([{"name": "Dr. A"}], True)
+
+
+def test_failed_scrape_is_retried(tmp_path, monkeypatch):
+    monkeypatch.setattr(directory_cache, "_cache", DirectoryCache(str(tmp_path / "cache.sqlite3")))
+    loads = []
+
+    async def scrape(providers):
+        loads.append(len(providers))
+        return providers
+
+    async def collect(providers):
+        return [p async for p in cached_providers("k", lambda: scrape(providers))]
+
+    assert asyncio.run(collect([])) == []
+    assert asyncio.run(collect([{"name": "Dr. A"}])) == [{"name": "Dr. A"}]
+    assert asyncio.run(collect([])) == [{"name": "Dr. A"}]  # served from the cache
+    assert loads == [0, 1]
+
+
+
+def test_async_methods_run_sqlite_off_the_loop(tmp_path):
+    cache = DirectoryCache(str(tmp_path / "cache.sqlite3"))
+    threads = []
+    get, put = cache.get, cache.put
+    cache.get = lambda key: threads.append(threading.get_ident()) or get(key)
+    cache.put = lambda key, providers: threads.append(threading.get_ident()) or put(key, providers)
+
+    async def scenario():
+        await cache.aput("k", [{"name": "Dr. A"}])
+        return await cache.aget("k")
+
+    assert asyncio.run(scenario()) == ([{"name": "Dr. A"}], True)
+    assert len(threads) == 2 and threading.get_ident() not in threads
@@ -0,0 +1,48 @@
+import os
+import pytest
+from extractors import extract_rating
+from html_scan import scan_html
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def load(name: str) -> str:
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("fixture, site, rating, reviews", [
+    ("healthgrades_jsonld.html", "https://www.healthgrades.com/physician/dr-jane-doe", 4.6, 123),
+    ("healthgrades_state.html", "https://www.healthgrades.com/physician/dr-sam-lee", 4.3, 57),
+    ("vitals_microdata.html", "https://www.vitals.com/doctors/Dr_Ann_Park.html", 3.9, 41),
+])
+def test_structured_data_is_extracted(fixture, site, rating, reviews):
+    result = extract_rating(site, load(fixture))
+    assert result is not None
+    assert (result["rating"], result["reviews"]) == (rating, reviews)
+
+
+@pytest.mark.parametrize("fixture, site", [
+    ("vitals_dates_and_images.html", "https://www.vitals.com/doctors/Dr_Ann_Park.html"),
+    ("vitals_dates_and_images.html", "https://www.healthgrades.com/physician/dr-ann-park"),
+    ("vitals_dates_and_images.html", "https://www.ratemds.com/doctor-ratings/ann-park"),
+    ("ratemds_year.html", "https://www.ratemds.com/doctor-ratings/omar-haddad"),
+])
+def test_dates_years_and_asset_paths_are_not_ratings(fixture, site):
+    html = load(fixture)
+    assert extract_rating(site, html) is None
+    assert extract_rating(site, html, min_confidence=0) is None
+
+
+def test_text_patterns_do_not_bypass_the_llm():
+    html = load("ratemds_text_only.html")
+    site = "https://www.ratemds.com/doctor-ratings/omar-haddad"
+    assert extract_rating(site, html) is None
+    hint = extract_rating(site, html, min_confidence=0)
+    assert (hint["rating"], hint["reviews"]) == (4.5, 120)
+
+
+def test_scan_is_reused():
+    html = load("healthgrades_jsonld.html")
+    site = "https://www.healthgrades.com/physician/dr-jane-doe"
+    assert extract_rating(site, html, scan_html(html)) == extract_rating(site, html)
@@ -0,0 +1,50 @@
+import asyncio
+
+import hedging
+from hedging import Hedger
+
+
+class Slots:
+    def __init__(self, free):
+        self.free = free
+
+    def try_acquire(self, n=1):
+        if n > self.free:
+            return False
+        self.free -= n
+        return True
+
+    async def release(self, n=1):
+        self.free += n
+
+
+def run_slow_call(slots):
+    hedger = Hedger("test", max_extra=1.0)
+    hedger.latencies.extend([0.01] * 20)
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.1 if len(calls) == 1 else 0)
+        return len(calls)
+
+    async def scenario():
+        return await hedger.run(call, slots, 2)
+
+    return asyncio.run(scenario()), hedger.counts, calls
+
+
+def test_hedge_takes_and_returns_slots(monkeypatch):
+    monkeypatch.setattr(hedging, "HEDGING", True)
+    slots = Slots(2)
+    result, counts, calls = run_slow_call(slots)
+    assert (counts["hedged"], counts["hedge_wins"], len(calls)) == (1, 1, 2)
+    assert slots.free == 2
+
+
+def test_no_hedge_without_free_slots(monkeypatch):
+    monkeypatch.setattr(hedging, "HEDGING", True)
+    slots = Slots(1)
+    result, counts, calls = run_slow_call(slots)
+    assert (counts["hedged"], counts["no_slot"], len(calls)) == (0, 1, 1)
+    assert slots.free == 1
@@ -0,0 +1,35 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("langchain_openai")
+import llm_gateway
+
+
+class SlowLLM:
+    def __init__(self):
+        self.prompts = []
+
+    async def ainvoke(self, prompt):
+        self.prompts.append(prompt)
+        await asyncio.sleep(0.05)
+        return f"answer to {prompt}"
+
+    async def abatch(self, prompts, config=None, return_exceptions=False):
+        return [await self.ainvoke(p) for p in prompts]
+
+
+def test_cancelled_owner_does_not_fail_joined_callers(monkeypatch):
+    llm = SlowLLM()
+    monkeypatch.setattr(llm_gateway, "_llm", llm)
+
+    async def scenario():
+        owner = asyncio.ensure_future(llm_gateway.complete("q"))
+        await asyncio.sleep(0)
+        joined = asyncio.ensure_future(llm_gateway.complete("q"))
+        await asyncio.sleep(0.01)
+        owner.cancel()
+        return await joined
+
+    assert asyncio.run(scenario()) == "answer to q"
+    assert llm.prompts == ["q"]
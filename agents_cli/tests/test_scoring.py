@@ -0,0 +1,17 @@
+import pytest
+
+pytest.importorskip("langchain_openai")
+from scoring import specialty_match
+
+
+@pytest.mark.parametrize("provider, requested, expected", [
+    ("Internal Medicine", "Internal Medicine", 1.0),
+    ("Cardiology", "cardiology", 1.0),
+    ("Pediatric Cardiology", "Cardiology", 1.0),
+    ("Internal Medicine", "Family Medicine", 0.5),
+    ("Family Medicine", "Internal Medicine", 0.5),
+    ("Cardiology", "Family Medicine", 0.0),
+    (None, "Cardiology", 0.0),
+])
+def test_specialty_match(provider, requested, expected):
+    assert specialty_match(provider, requested) == expected
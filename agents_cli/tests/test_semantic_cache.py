@@ -0,0 +1,58 @@
+import json
+
+import numpy as np
+import pytest
+
+from semantic_cache import SemanticCache, embed
+
+HITS = [
+    ("pain in chest while climbing stairs", "chest pains on stairs"),
+    ("numbness in fingers", "numb fingers"),
+    ("trouble sleeping at night", "cant sleep at night"),
+    ("swollen ankles", "ankle swelling"),
+    ("feeling dizzy when standing up", "dizziness when I stand up"),
+]
+MISSES = [
+    ("chest pain", "stomach pain"),
+    ("numb fingers", "numb toes"),
+    ("trouble sleeping", "trouble breathing"),
+    ("pain in chest while climbing stairs", "pain in knee while climbing stairs"),
+    ("swollen ankles", "swollen gums"),
+]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SemanticCache(str(tmp_path / "symptoms.npz"))
+
+
+@pytest.mark.parametrize("stored, asked", HITS)
+def test_paraphrase_hits(cache, stored, asked):
+    cache.add(stored, 45, "F", "Cardiology")
+    assert cache.lookup(asked, 45, "F") == "Cardiology"
+
+
+@pytest.mark.parametrize("stored, asked", MISSES)
+def test_different_complaint_misses(cache, stored, asked):
+    cache.add(stored, 45, "F", "Cardiology")
+    assert cache.lookup(asked, 45, "F") is None
+
+
+def test_other_segment_misses(cache):
+    cache.add("numb fingers", 45, "F", "Neurology")
+    assert cache.lookup("numb fingers", 8, "F") is None
+
+
+def test_old_vectors_are_reembedded(tmp_path):
+    path = str(tmp_path / "symptoms.npz")
+    cache = SemanticCache(path)
+    cache.add("numbness in fingers", 45, "F", "Neurology")
+    cache.vectors[0] = embed("unrelated words entirely")  # as if saved by an older embed()
+    cache.save()
+    with np.load(path) as data:
+        arrays = dict(data)
+    meta = json.loads(str(arrays["meta"]))
+    del meta["embed_version"]
+    arrays["meta"] = np.array(json.dumps(meta))
+    np.savez_compressed(path, **arrays)
+    assert SemanticCache(path).lookup("numb fingers", 45, "F") == "Neurology"
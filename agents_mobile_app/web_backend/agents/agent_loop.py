@@ -0,0 +1,53 @@
+"""One long-lived event loop for the agents, shared by every request.
+
+Django's async_to_sync gives each request a new event loop, but the browser
+pool, the HTTP client, directory sessions and the directory cache's in-flight
+scrapes are bound to the loop that created them. Running the agents here keeps
+them warm across requests instead of leaking one set per loop.
+"""
+import asyncio
+import threading
+from typing import Optional
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_lock = threading.Lock()
+_DONE = object()
+
+
+def get_agent_loop() -> asyncio.AbstractEventLoop:
+    """The agents' loop, started in a daemon thread on first use."""
+    global _loop
+    with _lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="agents-loop", daemon=True).start()
+    return _loop
+
+
+async def run_on_agent_loop(coro):
+    """Await `coro` on the agents' loop from any other loop (cancelling the caller cancels it)."""
+    loop = get_agent_loop()
+    if asyncio.get_running_loop() is loop:
+        return await coro
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+
+async def iterate_on_agent_loop(source):
+    """Async generator over `source` (an async iterator) advanced on the agents' loop."""
+    iterator = source.__aiter__()
+
+    async def step():
+        try:
+            return await iterator.__anext__()
+        except StopAsyncIteration:
+            return _DONE
+
+    try:
+        while True:
+            item = await run_on_agent_loop(step())
+            if item is _DONE:
+                return
+            yield item
+    finally:
+        if hasattr(iterator, "aclose"):
+            await run_on_agent_loop(iterator.aclose())
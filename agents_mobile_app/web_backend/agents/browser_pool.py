@@ -0,0 +1,179 @@
+"""Warm Chromium pool for the BCBS directory: browsers stay up, each search leases a fresh context."""
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from playwright.async_api import async_playwright
+from playwright.async_api import Error as PlaywrightError
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from .deadline import remaining
+
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "2"))      # browsers kept warm (= concurrent searches)
+BROWSER_MAX_USES = int(os.getenv("BROWSER_MAX_USES", "50"))       # leases before a browser is recycled
+BROWSER_PROBE_AFTER = float(os.getenv("BROWSER_PROBE_AFTER", "60"))  # idle seconds before a health probe
+BROWSER_MAX_TABS = int(os.getenv("BROWSER_MAX_TABS", "4"))        # parallel result pages per search
+READY_SELECTOR = '[data-test="provider-card"]'
+NEXT_SELECTOR = os.getenv("BCBS_NEXT_SELECTOR", '[data-test="pagination-next"], a[rel="next"]')
+BLOCKED_RESOURCES = {"image", "font", "media"}
+BLOCKED_HOSTS = ("google-analytics.com", "googletagmanager.com", "doubleclick.net", "adobedtm.com",
+                 "omtrdc.net", "demdex.net", "newrelic.com", "nr-data.net", "hotjar.com", "segment.io",
+                 "facebook.net", "quantummetric.com")
+READY_TIMEOUT = float(os.getenv("BCBS_READY_TIMEOUT", "8"))       # seconds; cap on waiting for cards
+
+
+class BrowserPool:
+    """Fixed number of long-lived browsers, launched on first use.
+
+    lease() hands out an isolated BrowserContext (own cookies and storage) on one
+    of them and closes it afterwards. A browser that has disconnected, fails its
+    probe or has served BROWSER_MAX_USES leases is closed and relaunched.
+    """
+
+    def __init__(self, size: int = BROWSER_POOL_SIZE, headless: bool = True):
+        self.headless = headless
+        self._playwright = None
+        self._start_lock = asyncio.Lock()
+        self._slots = asyncio.Queue()
+        for _ in range(max(1, size)):
+            self._slots.put_nowait({"browser": None, "uses": 0, "last_used": 0.0})
+        self.counts = {"leases": 0, "launches": 0, "recycled": 0}
+
+    async def _launch(self, slot: dict):
+        async with self._start_lock:
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+        slot["browser"] = await self._playwright.chromium.launch(headless=self.headless)
+        slot["uses"] = 0
+        self.counts["launches"] += 1
+        print(f"🧭 Browser launched ({self.counts['launches']} so far)")
+
+    async def _healthy(self, slot: dict) -> bool:
+        browser = slot["browser"]
+        if browser is None or not browser.is_connected() or slot["uses"] >= BROWSER_MAX_USES:
+            return False
+        if time.monotonic() - slot["last_used"] < BROWSER_PROBE_AFTER:
+            return True
+        # Idle for a while: make sure it can still open a context
+        try:
+            probe = await asyncio.wait_for(browser.new_context(), timeout=5)
+            await probe.close()
+            return True
+        except (PlaywrightError, asyncio.TimeoutError):
+            return False
+
+    async def _recycle(self, slot: dict):
+        if slot["browser"] is not None:
+            self.counts["recycled"] += 1
+            try:
+                await slot["browser"].close()
+            except PlaywrightError:
+                pass
+            slot["browser"] = None
+        await self._launch(slot)
+
+    @asynccontextmanager
+    async def lease(self):
+        """Yield a fresh BrowserContext; waits while every browser is in use."""
+        slot = await self._slots.get()
+        try:
+            if not await self._healthy(slot):
+                await self._recycle(slot)
+            try:
+                context = await slot["browser"].new_context()
+            except PlaywrightError:
+                await self._recycle(slot)
+                context = await slot["browser"].new_context()
+            self.counts["leases"] += 1
+            try:
+                yield context
+            finally:
+                slot["uses"] += 1
+                slot["last_used"] = time.monotonic()
+                try:
+                    await context.close()
+                except PlaywrightError:
+                    slot["uses"] = BROWSER_MAX_USES  # browser likely died; recycle on next lease
+        finally:
+            self._slots.put_nowait(slot)
+
+    async def close(self):
+        while not self._slots.empty():
+            slot = self._slots.get_nowait()
+            if slot["browser"] is not None:
+                try:
+                    await slot["browser"].close()
+                except PlaywrightError:
+                    pass
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    def stats(self) -> dict:
+        return dict(self.counts)
+
+
+_pool: Optional[BrowserPool] = None
+_pool_loop = None
+
+
+def get_browser_pool(headless: bool = True) -> BrowserPool:
+    """Shared pool for the current event loop (Playwright objects can't cross loops).
+
+    The web backend runs every search on one loop (see agent_loop.py), so this
+    normally never changes; if it does, the old pool is closed on its own loop.
+    """
+    global _pool, _pool_loop
+    loop = asyncio.get_running_loop()
+    if _pool is None or _pool_loop is not loop:
+        if _pool is not None:
+            _retire(_pool, _pool_loop)
+        _pool = BrowserPool(headless=headless)
+        _pool_loop = loop
+    return _pool
+
+
+def _retire(pool: BrowserPool, loop: asyncio.AbstractEventLoop):
+    """Close a pool left behind by another event loop, without waiting for it."""
+    if loop.is_running():
+        asyncio.run_coroutine_threadsafe(pool.close(), loop)
+    else:
+        # Its loop is gone, so Playwright can't be driven any more; the driver exits with the process
+        print(f"⚠️ Browser pool from a closed event loop dropped with {pool.counts['launches']} launch(es)")
+
+
+async def close_browser_pool():
+    global _pool
+    if _pool is not None and _pool_loop is asyncio.get_running_loop():
+        await _pool.close()
+    _pool = None
+
+
+async def wait_for_cards(page, deadline: Optional[float] = None) -> bool:
+    """Wait until provider cards render (at most READY_TIMEOUT, never past `deadline`)."""
+    timeout_ms = max(1, int(min(READY_TIMEOUT, remaining(deadline)) * 1000))  # 0 would mean no timeout
+    try:
+        await page.wait_for_selector(READY_SELECTOR, timeout=timeout_ms)
+        return True
+    except PlaywrightTimeoutError:
+        return False
+
+
+async def has_next_control(page) -> bool:
+    """Whether the rendered results show an enabled "next page" control."""
+    control = await page.query_selector(NEXT_SELECTOR)
+    if control is None:
+        return False
+    disabled = await control.get_attribute("aria-disabled")
+    return await control.is_enabled() and disabled != "true"
+
+
+async def block_resources(route):
+    """Route handler: abort images, fonts, media and analytics; let everything else through."""
+    request = route.request
+    if request.resource_type in BLOCKED_RESOURCES or any(host in request.url for host in BLOCKED_HOSTS):
+        await route.abort()
+    else:
+        await route.continue_()
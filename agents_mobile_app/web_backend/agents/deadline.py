@@ -0,0 +1,15 @@
+"""Deadline budget helpers: a search carries one absolute deadline through the graph state.
+
+Shared with the CLI; the code lives in agents_cli/deadline.py.
+"""
+from .shared import load_shared
+
+_deadline = load_shared("deadline")
+
+SEARCH_BUDGET = _deadline.SEARCH_BUDGET
+new_deadline = _deadline.new_deadline
+remaining = _deadline.remaining
+expired = _deadline.expired
+sub_deadline = _deadline.sub_deadline
+run_until = _deadline.run_until
+iterate_until = _deadline.iterate_until
@@ -0,0 +1,15 @@
+"""TTL cache of provider-directory results with stale-while-revalidate and single-flight refresh.
+
+Shared with the CLI; the code lives in agents_cli/directory_cache.py.
+"""
+from .shared import load_shared
+
+_directory_cache = load_shared("directory_cache")
+
+DIRECTORY_CACHE = _directory_cache.DIRECTORY_CACHE
+DIRECTORY_CACHE_PATH = _directory_cache.DIRECTORY_CACHE_PATH
+DIRECTORY_CACHE_TTL = _directory_cache.DIRECTORY_CACHE_TTL
+DIRECTORY_CACHE_STALE = _directory_cache.DIRECTORY_CACHE_STALE
+DirectoryCache = _directory_cache.DirectoryCache
+directory_key = _directory_cache.directory_key
+get_directory_cache = _directory_cache.get_directory_cache
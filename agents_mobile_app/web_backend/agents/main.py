@@ -2,17 +2,36 @@
 import asyncio
 from typing import TypedDict, Optional
 from langgraph.graph import StateGraph, START, END
+from langgraph.config import get_stream_writer
 from playwright.sync_api import sync_playwright
-from playwright.async_api import async_playwright
-from bs4 import BeautifulSoup
 import glob
 import csv
+import json
 import os
 import re
+import tempfile
 import urllib.parse
 import time
-
-from .utils import clean_bcbs_address, geocode_address
+import uuid
+
+from .utils import geocode_address
+from .parse_pool import parse_bcbs_api, parse_bcbs_page
+from .browser_pool import (BROWSER_MAX_TABS, READY_TIMEOUT, block_resources, close_browser_pool,
+                           get_browser_pool, has_next_control, wait_for_cards)
+from .directory_cache import directory_key, get_directory_cache
+from .deadline import SEARCH_BUDGET, iterate_until, new_deadline, remaining, sub_deadline
+
+FETCH_SHARE = 0.7  # share of the remaining budget for loading BCBS pages; the rest parses/geocodes
+# Point this at a local static server (e.g. `python -m http.server`) serving a saved results page to test offline
+BCBS_BASE_URL = os.getenv("BCBS_BASE_URL", "https://provider.bcbs.com/app/public/#/one/")
+# "api": take provider records from the app's own JSON responses, falling back to rendered HTML; "html": cards only
+BCBS_SCRAPE_MODE = os.getenv("BCBS_SCRAPE_MODE", "api")
+BCBS_API_PATTERN = re.compile(os.getenv("BCBS_API_PATTERN", r"provider|practitioner|search"), re.I)
+BCBS_DEBUG_DUMP = os.getenv("BCBS_DEBUG_DUMP", "0") == "1"  # copy each page to a per-request temp dir
+BCBS_RADIUS = 25  # miles; part of the search URL and the directory cache key
+DIRECTORY_MAX_PAGES = int(os.getenv("DIRECTORY_MAX_PAGES", "10"))         # result pages a session may fetch
+DIRECTORY_MIN_PROVIDERS = int(os.getenv("DIRECTORY_MIN_PROVIDERS", "1"))  # pages are pulled until this many
+DIRECTORY_SESSION_TTL = float(os.getenv("DIRECTORY_SESSION_TTL", "1800"))  # idle seconds before a session is dropped
 
 # -----------------------------
 # 1. Graph State Schema
@@ -24,6 +43,12 @@ class GraphState(TypedDict):
     location: Optional[str]
     postal_code: Optional[str]
     providers: Optional[list]
+    budget_s: Optional[float]   # requested end-to-end budget (seconds)
+    deadline: Optional[float]   # wall-clock timestamp; see deadline.py
+    partial: Optional[bool]     # some work was cut off by the deadline
+    min_providers: Optional[int]      # stop pulling result pages once this many providers are found
+    directory_session: Optional[str]  # id for fetching more pages later (see DirectorySession)
+    has_more: Optional[bool]          # the directory has pages not fetched yet
 
 
 # -----------------------------
@@ -37,122 +62,375 @@ async def get_user_info(state: GraphState):
     state["specialty"] = state.get("specialty") or "Cardiology"
     state["location"] = state.get("location") or "College Station, TX 77840"
     state["postal_code"] = state.get("postal_code") or "77840"
+    state["deadline"] = state.get("deadline") or new_deadline(float(state.get("budget_s") or SEARCH_BUDGET))
+    state["partial"] = False
     print(f"User: {state}")
     return state
 
 
 # -----------------------------
-# 3. Fetch BCBS HTML pages
+# 3. Stream BCBS result pages
 # -----------------------------
-
-async def get_bcbs_html_multi(postal_code, prefix, specialty, location, max_pages=4, headless=True):
-    """Fetch multiple BCBS result pages asynchronously and save HTML."""
-    import urllib.parse, asyncio, time
-
+def bcbs_search_url(postal_code, prefix, specialty, location) -> str:
     encoded_loc = urllib.parse.quote(location)
     encoded_spec = urllib.parse.quote(specialty)
-
-    base_url = (
-        f"https://provider.bcbs.com/app/public/#/one/"
+    return (
+        f"{BCBS_BASE_URL}"
         f"city=&state=&postalCode={postal_code}&country=&insurerCode=BCBSA_I"
         f"&brandCode=BCBSANDHF&alphaPrefix={prefix.lower()}&bcbsaProductId"
         f"/search/alphaPrefix={prefix.upper()}"
         f"&isPromotionSearch=true"
         f"&location={encoded_loc}"
-        f"&radius=25"
+        f"&radius={BCBS_RADIUS}"
         f"&searchCategory=SPECIALTY"
         f"&query={encoded_spec}"
     )
 
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=headless)
-        page = await browser.new_page()
-
-        for i in range(1, max_pages + 1):
-            url = f"{base_url}&page={i}"
-            print(f"🌐 Loading page {i}: {url}")
-            await page.goto(url)
-            await page.wait_for_timeout(8000)
-            html = await page.content()
-            filename = f"bcbs_result_page{i}.html"
-            with open(filename, "w", encoding="utf-8") as f:
-                f.write(html)
-            print(f"✅ Saved {filename}")
-            await asyncio.sleep(2)
-
-        await browser.close()
-    print("🎯 All pages saved.")
-
-
-# -----------------------------
-# 4. Parse BCBS HTML pages
-# -----------------------------
-def parse_all_bcbs_pages(delete_after=True):
-    def parse_bcbs_html(file_path):
-        with open(file_path, "r", encoding="utf-8") as f:
-            soup = BeautifulSoup(f, "html.parser")
-
-        doctors = []
-        cards = soup.find_all("div", {"data-test": "provider-card"})
-
-        for card in cards:
-            name_tag = (
-                card.find("h2", {"data-test": "provider-r-card-header-name"})
-                or card.find("a", {"data-test": "provider-r-card-header-name"})
-                or card.find("h2", string=re.compile(r"(MD|DO|PhD|NP)", re.I))
-            )
-            name = name_tag.get_text(strip=True) if name_tag else "N/A"
-
-            specialty_tag = card.find("div", {"data-test": "specialties"})
-            specialty = specialty_tag.get_text(strip=True) if specialty_tag else "N/A"
-
-            address_tag = card.find("address", {"data-test": "provider-address"})
-            address = address_tag.get_text(" ", strip=True) if address_tag else "N/A"
-            address = clean_bcbs_address(address)
-
-            lat, lng = geocode_address(address)
-            
-
-            phone_tag = card.find("a", href=lambda x: x and x.startswith("tel:"))
-            phone = phone_tag.get_text(strip=True) if phone_tag else "N/A"
-            
-
-
-            doctors.append({
-                "name": name,
-                "specialty": specialty,
-                "address": address,
-                "phone": phone,
-                "lat": lat,
-                "lng": lng,
-                "source_file": os.path.basename(file_path),
-            })
-        return doctors
-
-    all_doctors = []
-    html_files = sorted(glob.glob("bcbs_result_page*.html"))
-    for file_path in html_files:
-        print(f"🔍 Parsing {file_path} ...")
-        docs = parse_bcbs_html(file_path)
-        print(f"✅ Found {len(docs)} providers.")
-        all_doctors.extend(docs)
 
-        if delete_after:
+def dump_page(page: dict, dump_dir: str):
+    """Debug copy of one streamed page (BCBS_DEBUG_DUMP=1)."""
+    path = os.path.join(dump_dir, page["source"])
+    if "doctors" in page:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(page["doctors"], f, indent=2)
+    else:
+        with open(path, "wb") as f:
+            f.write(page["html"])
+
+
+async def stream_bcbs_pages(postal_code, prefix, specialty, location, max_pages=4, headless=True,
+                            deadline=None, dump_dir=None, first_page=1):
+    """Async generator of BCBS result pages, loaded in parallel tabs of a pooled browser.
+
+    Loads pages first_page .. first_page + max_pages - 1 and yields each as soon
+    as it is ready, in completion order:
+    {"page", "source", "doctors", "has_next"} when records were intercepted from the
+    directory's JSON ("api" mode), else {"page", "source", "html", "has_next"} (rendered bytes).
+    has_next is False only when the page shows there is no next page, None when it can't tell.
+    Nothing touches the disk unless `dump_dir` is given.
+    """
+    base_url = bcbs_search_url(postal_code, prefix, specialty, location)
+    tabs = asyncio.Semaphore(max(1, BROWSER_MAX_TABS))
+
+    def watch_api(page, i):
+        """Capture the page's directory JSON; returns a coroutine function awaiting the first providers
+        (or the news that there are none)."""
+        bodies, arrived = [], asyncio.Event()
+
+        async def capture(response):
+            if response.request.resource_type not in ("xhr", "fetch") or not BCBS_API_PATTERN.search(response.url):
+                return
+            if "json" not in response.headers.get("content-type", ""):
+                return
             try:
-                os.remove(file_path)
-                print(f"🗑️ Deleted {file_path}")
-            except Exception as e:
-                print(f"⚠️ Could not delete {file_path}: {e}")
+                bodies.append(await response.body())
+                arrived.set()
+            except Exception:
+                pass  # page navigated or closed mid-read
+
+        async def first_records():
+            # The app may fetch config or facets first; wait for a response that holds providers
+            while True:
+                await arrived.wait()
+                arrived.clear()
+                parsed = await parse_bcbs_api(list(bodies), f"bcbs_result_page{i}.json", i)
+                if parsed["doctors"] or parsed["has_next"] is False:
+                    return parsed
+
+        page.on("response", capture)
+        return first_records
+
+    async def load(context, i):
+        url = f"{base_url}&page={i}"
+        try:
+            async with tabs:
+                page = await context.new_page()
+                try:
+                    if BCBS_SCRAPE_MODE == "api":
+                        first_records = watch_api(page, i)
+                    print(f"🌐 Loading page {i}: {url}")
+                    await page.goto(url, wait_until="domcontentloaded")
+                    if BCBS_SCRAPE_MODE == "api":
+                        try:
+                            parsed = await asyncio.wait_for(first_records(),
+                                                            timeout=min(READY_TIMEOUT, remaining(deadline)))
+                            return {"page": i, "source": f"bcbs_result_page{i}.json", **parsed}
+                        except asyncio.TimeoutError:
+                            print(f"⚠️ No directory JSON on page {i}; falling back to rendered HTML")
+                    has_next = None  # cards never rendered: can't tell whether more pages follow
+                    if await wait_for_cards(page, deadline):
+                        has_next = await has_next_control(page)
+                    else:
+                        print(f"⚠️ No provider cards on page {i} yet; using what rendered")
+                    html = await page.content()
+                    return {"page": i, "source": f"bcbs_result_page{i}.html", "html": html.encode("utf-8"),
+                            "has_next": has_next}
+                finally:
+                    await page.close()
+        except Exception as e:
+            print(f"⚠️ Page {i} failed: {e}")
+            return None
+
+    # One isolated context per search; browsers stay warm between searches
+    async with get_browser_pool(headless=headless).lease() as context:
+        await context.route("**/*", block_resources)  # no images, fonts or analytics
+        tasks = [asyncio.ensure_future(load(context, i)) for i in range(first_page, first_page + max_pages)]
+        try:
+            for next_page in asyncio.as_completed(tasks):
+                page = await next_page
+                if page is None:
+                    continue
+                print(f"✅ Loaded {page['source']}")
+                if dump_dir:
+                    dump_page(page, dump_dir)
+                yield page
+        finally:
+            # Closed early (deadline or consumer gone): stop the other tabs before the context closes
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
 
+
+# -----------------------------
+# 4. Parse BCBS pages as they arrive
+# -----------------------------
+async def parse_bcbs_result(page: dict, deadline=None) -> list:
+    if "doctors" in page:
+        doctors = page["doctors"]  # already mapped from the directory API
+    else:
+        # Card parsing runs in the process pool; only bytes go out, small dicts come back
+        doctors = await parse_bcbs_page(page["html"], page["source"])
+    # Geocoding is network-bound, so it stays here (concurrent, paced by the outbound scheduler).
+    # Addresses not geocoded by the deadline come back without coordinates, flagged partial.
+    tasks = [asyncio.ensure_future(geocode_address(d["address"])) for d in doctors]
+    if tasks:
+        await asyncio.wait(tasks, timeout=remaining(deadline) if deadline else None)
+    for d, task in zip(doctors, tasks):
+        if task.done():
+            d["lat"], d["lng"] = task.result()
+            d["partial"] = False
+        else:
+            task.cancel()
+            d["lat"], d["lng"] = None, None
+            d["partial"] = True
+    print(f"✅ Found {len(doctors)} providers in {page['source']}.")
+    return doctors
+
+
+async def parse_bcbs_stream(pages, fetch_deadline=None, deadline=None, on_page=None) -> tuple:
+    """Parse and geocode each page while later ones are still loading.
+
+    Pages arriving after `fetch_deadline` are skipped. Returns (doctors, cut_off).
+    """
+    tasks, cut_off = [], False
+
+    async def parse(page):
+        doctors = await parse_bcbs_result(page, deadline)
+        if on_page is not None:
+            on_page(page, doctors)
+        return doctors
+
+    try:
+        async for page in iterate_until(pages, fetch_deadline):
+            tasks.append(asyncio.ensure_future(parse(page)))
+    except asyncio.TimeoutError:
+        # Pages already received are still parsed
+        print("⏱️ BCBS page load ran out of time.")
+        cut_off = True
+    parsed = await asyncio.gather(*tasks)
+    all_doctors = [d for doctors in parsed for d in doctors]
     if not all_doctors:
         print("⚠️ No providers extracted.")
-        return []
+    return all_doctors, cut_off
 
-    return all_doctors
+
+# -----------------------------
+# 5. Lazy directory sessions
+# -----------------------------
+class DirectorySession:
+    """One search's BCBS results, fetched a page at a time as consumers ask for more.
+
+    Pages already fetched are kept for the session, so "show more" and
+    re-reads never reload them. A page that comes back empty (often a render
+    timeout) is not kept and is tried again on the next call; the results end
+    only when a page shows no "next" control.
+    """
+
+    def __init__(self, postal_code, prefix, specialty, location, headless=True, max_pages=DIRECTORY_MAX_PAGES):
+        self.params = {"postal_code": postal_code, "prefix": prefix, "specialty": specialty, "location": location}
+        self.headless = headless
+        self.max_pages = max_pages
+        self.pages = {}  # page number → providers
+        self.page_has_next = {}  # page number → has_next the page reported (False: no "next" control)
+        self.exhausted = False
+        self.last_page = None  # kept page that showed no "next" control
+        self.last_used = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    @property
+    def next_page(self) -> int:
+        return len(self.pages) + 1
+
+    @property
+    def has_more(self) -> bool:
+        return not self.exhausted and self.next_page <= self.max_pages
+
+    def providers(self) -> list:
+        return [d for n in sorted(self.pages) for d in self.pages[n]]
+
+    def cache_key(self, first: int, count: int = 1) -> str:
+        p = self.params
+        key = f"{directory_key(p['prefix'], p['postal_code'], p['specialty'], BCBS_RADIUS)}#p{first}"
+        return key if count == 1 else f"{key}+{count}"
+
+    async def _scrape(self, first, count, deadline=None, on_page=None) -> tuple:
+        """Scrape pages first .. first + count - 1 → ({page: (providers, has_next)}, cut_off); caches complete pages."""
+        cache = get_directory_cache()
+        scraped, writes = {}, []
+
+        def keep(page, doctors):
+            scraped[page["page"]] = (doctors, page.get("has_next"))
+            # Empty pages (often a render timeout) and pages with addresses left
+            # un-geocoded by the deadline aren't worth keeping
+            if cache is not None and doctors and not any(d.get("partial") for d in doctors):
+                writes.append(asyncio.ensure_future(cache.aput(self.cache_key(page["page"]), doctors)))
+            if on_page is not None:
+                on_page(page, doctors)
+
+        dump_dir = tempfile.mkdtemp(prefix="bcbs_") if BCBS_DEBUG_DUMP else None
+        if dump_dir:
+            print(f"🐞 Dumping BCBS pages to {dump_dir}")
+        pages = stream_bcbs_pages(**self.params, first_page=first, max_pages=count, headless=self.headless,
+                                  deadline=deadline, dump_dir=dump_dir)
+        try:
+            _, cut_off = await parse_bcbs_stream(pages, sub_deadline(deadline, FETCH_SHARE), deadline, on_page=keep)
+        finally:
+            await pages.aclose()
+            await asyncio.gather(*writes, return_exceptions=True)
+        return scraped, cut_off
+
+    def _store(self, n, doctors, has_next=None, on_page=None):
+        self.page_has_next[n] = has_next
+        if doctors:
+            self.pages[n] = doctors
+            if on_page is not None:
+                on_page({"page": n}, doctors)
+
+    def _settle(self):
+        """Keep pages 1..k contiguous and work out from them alone whether the results have ended.
+
+        A failed, empty or cut-off page drops the pages loaded after it, so the
+        next call starts again from the hole. Pages past the last one (some
+        directories repeat it for out-of-range numbers) go too. An empty page
+        right after the kept ones that shows no "next" control also ends them.
+        """
+        n, end = 1, None
+        while n in self.pages:
+            if self.page_has_next.get(n) is False:
+                end = n
+                break
+            n += 1
+        else:
+            if self.page_has_next.get(n) is False:
+                end = n - 1
+        kept = end if end is not None else n - 1
+        for k in [k for k in self.pages if k > kept]:
+            del self.pages[k]
+        self.page_has_next = {k: v for k, v in self.page_has_next.items() if k <= kept + 1}
+        self.exhausted = end is not None
+        self.last_page = end
+
+    async def fetch(self, count=1, deadline=None, on_page=None) -> tuple:
+        """Fetch the next `count` pages not in this session yet. Returns (new providers, cut_off).
+
+        Cached pages come back immediately (stale ones are refreshed in the
+        background); the rest load in parallel tabs, shared with any identical
+        search already scraping them.
+        """
+        async with self._lock:  # concurrent "more" calls must not fetch the same page twice
+            self.last_used = time.monotonic()
+            first = first_requested = self.next_page
+            count = min(count, self.max_pages - first + 1)
+            if self.exhausted or count <= 0:
+                return [], False
+
+            cache = get_directory_cache()
+            while cache is not None and count > 0 and not self.exhausted:
+                hit = await cache.aget(self.cache_key(first))
+                if hit is None:
+                    break
+                doctors, fresh = hit
+                if not fresh:
+                    cache.revalidate(self.cache_key(first), lambda n=first: self._scrape(n, 1, new_deadline()))
+                print(f"⚡ Page {first} from the directory cache ({'fresh' if fresh else 'stale'})")
+                self._store(first, doctors, on_page=on_page)
+                first, count = first + 1, count - 1
+
+            cut_off = False
+            if count > 0 and not self.exhausted:
+                streamed, waiting = set(), True
+
+                def relay(page, doctors):
+                    # Stream pages to the caller that started the scrape while it is still waiting
+                    if waiting and on_page is not None:
+                        streamed.add(page["page"])
+                        on_page(page, doctors)
+
+                load = lambda: self._scrape(first, count, deadline, relay)
+                try:
+                    if cache is not None:
+                        scraped, cut_off = await cache.single_flight(self.cache_key(first, count), load)
+                    else:
+                        scraped, cut_off = await load()
+                finally:
+                    waiting = False
+                for n in sorted(scraped):
+                    doctors, has_next = scraped[n]
+                    self._store(n, doctors, has_next, None if n in streamed else on_page)
+
+            self._settle()
+            new = [d for n in sorted(self.pages) if n >= first_requested for d in self.pages[n]]
+            return new, cut_off
+
+    async def iter_pages(self, deadline=None, on_page=None):
+        """Async iterator over result pages: cached ones first, then one fetch per step."""
+        n = 1
+        while True:
+            if n not in self.pages:
+                if not self.has_more:
+                    return
+                _, cut_off = await self.fetch(1, deadline, on_page)
+                if cut_off or n not in self.pages:
+                    return
+            yield self.pages[n]
+            n += 1
+
+
+# Sessions outlive the request that started them (the graph state only carries their id)
+_sessions = {}
+
+
+def open_directory_session(**params) -> tuple:
+    sweep_directory_sessions()
+    session_id = uuid.uuid4().hex
+    _sessions[session_id] = DirectorySession(**params)
+    return session_id, _sessions[session_id]
+
+
+def get_directory_session(session_id: Optional[str]) -> Optional[DirectorySession]:
+    sweep_directory_sessions()
+    return _sessions.get(session_id) if session_id else None
+
+
+def sweep_directory_sessions():
+    cutoff = time.monotonic() - DIRECTORY_SESSION_TTL
+    for session_id, session in list(_sessions.items()):
+        if session.last_used < cutoff:
+            del _sessions[session_id]
 
 
 # -----------------------------
-# 5. Integrate into workflow
+# 6. Integrate into workflow
 # -----------------------------
 async def find_bcbs_providers(state: GraphState):
     insurance = state.get("insurance", "").lower()
@@ -163,22 +441,45 @@ async def find_bcbs_providers(state: GraphState):
     prefix = "ZGP"  # could be looked up dynamically later
     print(f"🔎 Searching BCBS with prefix {prefix} ...")
 
-    await get_bcbs_html_multi(
+    deadline = state.get("deadline")
+    session_id, session = open_directory_session(
         postal_code=state["postal_code"],
         prefix=prefix,
         specialty=state["specialty"],
         location=state["location"],
-        max_pages=1,
         headless=True,
     )
-
-    providers = parse_all_bcbs_pages(delete_after=True)
+    writer = get_stream_writer()
+
+    def emit(page, doctors):
+        for p in doctors:
+            writer({"type": "provider", "provider": p, "page": page["page"]})
+
+    # Pull pages only until there are enough providers; later pages wait for "more"
+    wanted = int(state.get("min_providers") or DIRECTORY_MIN_PROVIDERS)
+    providers, cut_off = [], False
+    try:
+        async for doctors in iterate_until(session.iter_pages(deadline, on_page=emit), deadline):
+            providers.extend(doctors)
+            if len(providers) >= wanted:
+                break
+    except asyncio.TimeoutError:
+        print("⏱️ BCBS page load ran out of time.")
+        cut_off = True
+    if not session.pages:
+        cut_off = True  # nothing came back in time
+
+    state["partial"] = state.get("partial") or cut_off or any(p.get("partial") for p in providers)
+    state["directory_session"] = session_id
+    state["has_more"] = session.has_more
+    writer({"type": "final", "providers": providers, "partial": state["partial"],
+            "directory_session": session_id, "has_more": state["has_more"]})
     state["providers"] = providers
     return state
 
 
 # -----------------------------
-# 6. Build LangGraph
+# 7. Build LangGraph
 # -----------------------------
 graph = StateGraph(GraphState)
 graph.add_node("GetUserInfo", get_user_info)
@@ -192,7 +493,7 @@ app = graph.compile()
 
 
 # -----------------------------
-# 7. Run the workflow
+# 8. Run the workflow
 # -----------------------------
 async def run():
     result = await app.ainvoke({})
@@ -201,6 +502,7 @@ async def run():
     if result["providers"]:
         for p in result["providers"][:5]:
             print(f"- {p['Name']} | {p['Specialty']} | {p['Address']} | {p['Phone']}")
+    await close_browser_pool()
 
 
 if __name__ == "__main__":
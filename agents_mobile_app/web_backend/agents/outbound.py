@@ -0,0 +1,15 @@
+"""Per-host outbound scheduler: rate limit, adaptive concurrency, retries, circuit breaker.
+
+Shared with the CLI; the code lives in agents_cli/outbound.py.
+"""
+from .shared import load_shared
+
+_outbound = load_shared("outbound")
+
+HOST_LIMITS = _outbound.HOST_LIMITS
+CircuitOpen = _outbound.CircuitOpen
+RetryableStatus = _outbound.RetryableStatus
+HostScheduler = _outbound.HostScheduler
+get_host = _outbound.get_host
+request = _outbound.request
+stats = _outbound.stats
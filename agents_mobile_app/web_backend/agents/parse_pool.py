@@ -0,0 +1,171 @@
+"""Process pool for CPU-bound HTML parsing, awaitable from the async graph nodes."""
+import json
+import re
+from typing import Optional
+
+from bs4 import BeautifulSoup
+
+from .shared import load_shared
+from .utils import clean_bcbs_address
+
+# -----------------------------
+# Pool (shared with the CLI; the code lives in agents_cli/process_pool.py)
+# -----------------------------
+_process_pool = load_shared("process_pool")
+
+PARSE_WORKERS = _process_pool.PARSE_WORKERS
+PARSE_POOL = _process_pool.PARSE_POOL
+get_parse_pool = _process_pool.get_parse_pool
+shutdown_parse_pool = _process_pool.shutdown_parse_pool
+run_in_pool = _process_pool.run_in_pool
+
+
+# -----------------------------
+# Worker functions (module level so they pickle; bytes in, small dicts out)
+# -----------------------------
+def parse_bcbs_html(raw: bytes, source_file: str = "") -> list:
+    """Provider cards from one BCBS results page. Geocoding is left to the caller."""
+    soup = BeautifulSoup(raw.decode("utf-8", errors="ignore"), "html.parser")
+
+    doctors = []
+    cards = soup.find_all("div", {"data-test": "provider-card"})
+
+    for card in cards:
+        name_tag = (
+            card.find("h2", {"data-test": "provider-r-card-header-name"})
+            or card.find("a", {"data-test": "provider-r-card-header-name"})
+            or card.find("h2", string=re.compile(r"(MD|DO|PhD|NP)", re.I))
+        )
+        name = name_tag.get_text(strip=True) if name_tag else "N/A"
+
+        specialty_tag = card.find("div", {"data-test": "specialties"})
+        specialty = specialty_tag.get_text(strip=True) if specialty_tag else "N/A"
+
+        address_tag = card.find("address", {"data-test": "provider-address"})
+        address = address_tag.get_text(" ", strip=True) if address_tag else "N/A"
+        address = clean_bcbs_address(address)
+
+        phone_tag = card.find("a", href=lambda x: x and x.startswith("tel:"))
+        phone = phone_tag.get_text(strip=True) if phone_tag else "N/A"
+
+        doctors.append({
+            "name": name,
+            "specialty": specialty,
+            "address": address,
+            "phone": phone,
+            "source_file": source_file,
+        })
+    return doctors
+
+
+# Keys the directory API has been seen to use for each field (first match wins)
+NAME_KEYS = ("displayName", "fullName", "providerName", "name")
+SPECIALTY_KEYS = ("specialties", "specialty", "primarySpecialty")
+ADDRESS_KEYS = ("addresses", "locations", "address", "location")
+PHONE_KEYS = ("phone", "phoneNumber", "telephone", "phones")
+MORE_KEYS = ("hasNext", "hasNextPage", "hasMore", "moreResults")
+PAGES_KEYS = ("totalPages", "pageCount", "numberOfPages")
+TOTAL_KEYS = ("totalCount", "totalResults", "totalElements", "total")
+PAGE_SIZE_KEYS = ("pageSize", "size", "limit", "perPage")
+
+
+def _first(obj: dict, keys: tuple):
+    for key in keys:
+        if obj.get(key):
+            return obj[key]
+    return None
+
+
+def _text(value) -> str:
+    """Flatten a JSON value (string, list or {name/description/...} object) to display text."""
+    if isinstance(value, list):
+        value = value[0] if value else None
+    if isinstance(value, dict):
+        parts = [value.get(k) for k in ("line1", "addressLine1", "line2", "city", "state", "postalCode", "zip")]
+        if any(parts):
+            return " ".join(str(p) for p in parts if p)
+        value = _first(value, ("name", "description", "displayName", "number", "value", "text"))
+    return str(value).strip() if value else "N/A"
+
+
+def _looks_like_provider(r: dict) -> bool:
+    named = _first(r, NAME_KEYS) or r.get("firstName") or r.get("lastName")
+    return bool(named and (_first(r, SPECIALTY_KEYS) or _first(r, ADDRESS_KEYS)))
+
+
+def _provider_lists(node):
+    """Yield every list of objects in the payload that looks like provider records."""
+    if isinstance(node, list):
+        if node and all(isinstance(x, dict) for x in node) and any(_looks_like_provider(x) for x in node):
+            yield node
+            return  # don't descend into the records' own lists (locations, networks, ...)
+        for x in node:
+            yield from _provider_lists(x)
+    elif isinstance(node, dict):
+        for value in node.values():
+            yield from _provider_lists(value)
+
+
+def _has_next(node, page: int) -> Optional[bool]:
+    """Whether the payload's paging fields say there is a page after `page` (None = no paging fields)."""
+    if isinstance(node, list):
+        for x in node:
+            found = _has_next(x, page)
+            if found is not None:
+                return found
+    elif isinstance(node, dict):
+        more = next((node[k] for k in MORE_KEYS if isinstance(node.get(k), bool)), None)
+        if more is not None:
+            return more
+        pages = next((node[k] for k in PAGES_KEYS if isinstance(node.get(k), int)), None)
+        if pages is not None:
+            return page < pages
+        total = next((node[k] for k in TOTAL_KEYS if isinstance(node.get(k), int)), None)
+        size = next((node[k] for k in PAGE_SIZE_KEYS if isinstance(node.get(k), int) and node[k] > 0), None)
+        if total is not None and size is not None:
+            return page * size < total
+        return _has_next(list(node.values()), page)
+    return None
+
+
+def parse_bcbs_json(bodies: list, source_file: str = "", page: int = 1) -> dict:
+    """Provider records from intercepted directory API responses (same shape as parse_bcbs_html).
+
+    Returns {"doctors", "has_next"}; has_next is None when no response carried paging fields.
+    """
+    doctors, seen, has_next = [], set(), None
+    for raw in bodies:
+        try:
+            payload = json.loads(raw)
+        except ValueError:
+            continue
+        if has_next is None:
+            has_next = _has_next(payload, page)
+        for records in _provider_lists(payload):
+            for r in records:
+                if not _looks_like_provider(r):
+                    continue
+                name = _first(r, NAME_KEYS)
+                if not name and (r.get("firstName") or r.get("lastName")):
+                    name = " ".join(x for x in (r.get("firstName"), r.get("lastName"), r.get("degree")) if x)
+                address = clean_bcbs_address(_text(_first(r, ADDRESS_KEYS)))
+                key = (_text(name), address)
+                if key in seen:
+                    continue
+                seen.add(key)
+                doctors.append({
+                    "name": key[0],
+                    "specialty": _text(_first(r, SPECIALTY_KEYS)),
+                    "address": address,
+                    "phone": _text(_first(r, PHONE_KEYS)),
+                    "source_file": source_file,
+                })
+    return {"doctors": doctors, "has_next": has_next}
+
+
+async def parse_bcbs_page(raw: bytes, source_file: str = "") -> list:
+    return await run_in_pool(parse_bcbs_html, raw, source_file)
+
+
+async def parse_bcbs_api(bodies: list, source_file: str = "", page: int = 1) -> dict:
+    return await run_in_pool(parse_bcbs_json, bodies, source_file, page)
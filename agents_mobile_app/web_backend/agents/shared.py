@@ -0,0 +1,34 @@
+"""Modules shared with agents_cli, loaded from there so there is only one copy to maintain.
+
+agents_cli keeps them as flat, stdlib-only modules (plus httpx/tenacity for
+outbound). They are loaded by path under an "agents_cli." name so they never
+shadow this package's modules. AGENTS_CLI_DIR overrides where they live.
+"""
+import importlib.util
+import os
+import sys
+from types import ModuleType
+
+AGENTS_CLI_DIR = os.getenv(
+    "AGENTS_CLI_DIR",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", "agents_cli")),
+)
+
+
+def load_shared(name: str) -> ModuleType:
+    """agents_cli/<name>.py as a module (loaded once per process)."""
+    qualified = f"agents_cli.{name}"
+    if qualified in sys.modules:
+        return sys.modules[qualified]
+    path = os.path.join(AGENTS_CLI_DIR, f"{name}.py")
+    spec = importlib.util.spec_from_file_location(qualified, path)
+    if spec is None or not os.path.exists(path):
+        raise ImportError(f"Shared module {name!r} not found at {path} (set AGENTS_CLI_DIR)")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[qualified] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[qualified]
+        raise
+    return module
@@ -0,0 +1,100 @@
+import asyncio
+import functools
+import importlib.util
+import os
+import threading
+import unittest
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from . import main
+from .browser_pool import close_browser_pool
+from .parse_pool import parse_bcbs_html
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+STAND_IN_NAMES = ["Jane Smith, MD", "Luis Garcia, DO", "Priya Patel, MD"]
+
+
+class StandInPageTests(unittest.TestCase):
+    """The offline BCBS stand-in page parses like a real results page."""
+
+    def test_cards_parse(self):
+        with open(os.path.join(FIXTURES, "bcbs_result_page1.html"), "rb") as f:
+            doctors = parse_bcbs_html(f.read(), "bcbs_result_page1.html")
+        self.assertEqual([d["name"] for d in doctors], STAND_IN_NAMES)
+        self.assertEqual(doctors[0]["specialty"], "Cardiology")
+        self.assertEqual(doctors[0]["address"], "1600 Rock Prairie Rd College Station, TX 77845")
+        self.assertEqual(doctors[0]["phone"], "(979) 764-3000")
+
+
+class DirectorySessionPagingTests(unittest.TestCase):
+    """Which pages a session keeps, and when it decides the results have ended."""
+
+    def fetch(self, session, count, scraped):
+        async def scrape(first, count, deadline=None, on_page=None):
+            return scraped, False
+
+        with mock.patch.object(main, "get_directory_cache", lambda: None), \
+                mock.patch.object(session, "_scrape", scrape):
+            return asyncio.run(session.fetch(count))
+
+    def test_gap_before_last_page_is_retried(self):
+        session = main.DirectorySession("77845", "ZGP", "Cardiology", "College Station, TX")
+        # Page 2 timed out empty; page 3 is the last page
+        self.fetch(session, 3, {1: ([{"name": "A"}], True), 2: ([], None), 3: ([{"name": "C"}], False)})
+        self.assertEqual(sorted(session.pages), [1])
+        self.assertFalse(session.exhausted)
+        self.assertIsNone(session.last_page)
+        self.assertTrue(session.has_more)
+
+        providers, _ = self.fetch(session, 2, {2: ([{"name": "B"}], True), 3: ([{"name": "C"}], False)})
+        self.assertEqual([p["name"] for p in providers], ["B", "C"])
+        self.assertEqual(session.last_page, 3)
+        self.assertFalse(session.has_more)
+
+    def test_repeated_last_page_is_dropped(self):
+        session = main.DirectorySession("77845", "ZGP", "Cardiology", "College Station, TX")
+        providers, _ = self.fetch(session, 2, {1: ([{"name": "A"}], False), 2: ([{"name": "A"}], False)})
+        self.assertEqual([p["name"] for p in providers], ["A"])
+        self.assertEqual(session.last_page, 1)
+        self.assertFalse(session.has_more)
+
+    def test_empty_page_without_next_ends_results(self):
+        session = main.DirectorySession("77845", "ZGP", "Cardiology", "College Station, TX")
+        self.fetch(session, 2, {1: ([{"name": "A"}], None), 2: ([], False)})
+        self.assertEqual(sorted(session.pages), [1])
+        self.assertFalse(session.has_more)
+
+
+@unittest.skipUnless(importlib.util.find_spec("playwright") and os.getenv("BROWSER_TESTS") == "1",
+                     "needs Playwright with Chromium installed (set BROWSER_TESTS=1)")
+class StandInScrapeTests(unittest.TestCase):
+    """A directory session scraping the stand-in over a local static server, browser and all."""
+
+    def setUp(self):
+        handler = functools.partial(SimpleHTTPRequestHandler, directory=FIXTURES)
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def test_session_reads_stand_in(self):
+        base_url = f"http://127.0.0.1:{self.server.server_port}/bcbs_result_page1.html#/one/"
+
+        async def no_geocode(address):
+            return None, None
+
+        async def scrape():
+            session = main.DirectorySession("77845", "ZGP", "Cardiology", "College Station, TX")
+            try:
+                return await session.fetch(2, main.new_deadline(30)), session  # page 2 repeats page 1
+            finally:
+                await close_browser_pool()
+
+        with mock.patch.multiple(main, BCBS_BASE_URL=base_url, BCBS_SCRAPE_MODE="html",
+                                 geocode_address=no_geocode, get_directory_cache=lambda: None):
+            (providers, cut_off), session = asyncio.run(scrape())
+
+        self.assertFalse(cut_off)
+        self.assertEqual([p["name"] for p in providers], STAND_IN_NAMES)
+        self.assertFalse(session.has_more)  # the stand-in's "next" control is disabled
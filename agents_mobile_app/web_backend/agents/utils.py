@@ -1,19 +1,46 @@
+import asyncio
 import os
-import googlemaps
+import httpx
 from dotenv import load_dotenv
+
+from . import outbound
+
 load_dotenv()
+
+GEOCODE_URL = "https://maps.googleapis.com/maps/api/geocode/json"
+
+_client = None
+_client_loop = None
+
+
 def clean_bcbs_address(raw_address: str) -> str:
     """Cleans and formats the raw address string from BCBS HTML."""
     clean_address = raw_address.split("•")[0].strip()
     return clean_address
 
-def geocode_address(address: str):
-    """Geocodes an address string into latitude and longitude using Google Maps API."""
+
+def get_http_client() -> httpx.AsyncClient:
+    """Shared async HTTP client for the current event loop."""
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        _client = httpx.AsyncClient(timeout=15.0)
+        _client_loop = loop
+    return _client
+
+
+async def geocode_address(address: str):
+    """Geocodes an address string into latitude and longitude using the Google Geocoding API.
+
+    Requests go through the outbound scheduler (rate limit, retries, circuit breaker).
+    """
     api_key = os.getenv("GOOGLE_GEOCODE_API_KEY")
-    print('here is the google geocode api_key', api_key)
-    gmaps = googlemaps.Client(key=api_key)
     try:
-        geocode_result = gmaps.geocode(address)
+        resp = await outbound.request(
+            get_http_client(), "GET", GEOCODE_URL, params={"address": address, "key": api_key}
+        )
+        resp.raise_for_status()
+        geocode_result = resp.json().get("results")
         if geocode_result:
             location = geocode_result[0]['geometry']['location']
             return location['lat'], location['lng']
@@ -1,14 +1,20 @@
 # views.py
 import inspect
+import json
 from typing import TypedDict, Optional, List, Dict, Any
 
 from asgiref.sync import sync_to_async, async_to_sync
+from django.http import StreamingHttpResponse
 from rest_framework import viewsets, filters, status
+from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 
 # ⬇️ NEW: use the compiled graph from agents/main.py
 from agents.main import app as agent_app
+from agents.main import get_directory_session
+from agents.agent_loop import iterate_on_agent_loop, run_on_agent_loop
+from agents.deadline import SEARCH_BUDGET, new_deadline
 
 from .models import UserSearch, SearchResult
 from .serializers import UserSearchSerializer, SearchResultSerializer
@@ -21,6 +27,26 @@ class GraphState(TypedDict, total=False):
     location: Optional[str]
     postal_code: Optional[str]
     providers: Optional[List[Dict[str, Any]]]
+    budget_s: Optional[float]
+    partial: Optional[bool]
+    min_providers: Optional[int]
+    directory_session: Optional[str]
+    has_more: Optional[bool]
+
+
+def build_init_state(payload: Dict[str, Any]) -> GraphState:
+    """Initial graph state from a request payload (same defaults as agents/main.py)."""
+    return {
+        "insurance": payload.get("insurance") or "Blue Cross Blue Shield",
+        "insurance_id": payload.get("insurance_id") or "",
+        "specialty": payload.get("specialty") or "Cardiology",
+        "location": payload.get("location") or "College Station, TX 77840",
+        "postal_code": payload.get("postal_code") or "77840",
+        # Optional end-to-end budget in seconds; the deadline starts when the graph runs
+        "budget_s": payload.get("budget_s"),
+        # Result pages are fetched until this many providers are found; the rest via `more`
+        "min_providers": payload.get("min_providers"),
+    }
 
 
 # ---------- ViewSets ----------
@@ -48,17 +74,11 @@ class UserSearchViewSet(viewsets.ModelViewSet):
 
         # 2) Prepare state for the new agents/main.py graph
         #    (falls back to the same defaults your main.py currently uses)
-        init_state: GraphState = {
-            "insurance": payload.get("insurance") or "Blue Cross Blue Shield",
-            "insurance_id": payload.get("insurance_id") or "",
-            "specialty": payload.get("specialty") or "Cardiology",
-            "location": payload.get("location") or "College Station, TX 77840",
-            "postal_code": payload.get("postal_code") or "77840",
-        }
-        state: GraphState = await agent_app.ainvoke(init_state)
-
-        # 3) Run the LangGraph
-        state: GraphState = await agent_app.ainvoke(init_state)
+        init_state: GraphState = build_init_state(payload)
+
+        # 3) Run the LangGraph (once — the deadline budget covers a single run)
+        #    on the agents' own loop, so the warm browser pool and sessions outlive this request
+        state: GraphState = await run_on_agent_loop(agent_app.ainvoke(init_state))
 
         # 4) Optionally persist anything you'd like from `state`
         #    (Keeping this minimal/neutral since model fields vary project-to-project)
@@ -81,6 +101,45 @@ class UserSearchViewSet(viewsets.ModelViewSet):
         data["graph_state"] = state  # expose the providers, etc., to the client
         return Response(data, status=status.HTTP_201_CREATED)
 
+    @action(detail=False, methods=["post"])
+    def stream(self, request, *args, **kwargs):
+        """Run the graph and forward its events as NDJSON lines while it works."""
+        payload: Dict[str, Any] = request.data or {}
+        init_state = build_init_state(payload)
+
+        async def events():
+            search: UserSearch = await sync_to_async(UserSearch.objects.create)(
+                query=payload.get("query", ""),
+                insurance_network_id=payload.get("insurance_network"),
+            )
+            yield json.dumps({"type": "search", "id": search.id}) + "\n"
+            async for event in iterate_on_agent_loop(agent_app.astream(init_state, stream_mode="custom")):
+                yield json.dumps(event, default=str) + "\n"
+
+        return StreamingHttpResponse(events(), content_type="application/x-ndjson")
+
+    @action(detail=False, methods=["post"])
+    def more(self, request, *args, **kwargs):
+        """Fetch the next directory page(s) of an earlier search ({"directory_session", "pages"})."""
+        return async_to_sync(self._more_async)(request, *args, **kwargs)
+
+    async def _more_async(self, request, *args, **kwargs):
+        payload: Dict[str, Any] = request.data or {}
+        session = get_directory_session(payload.get("directory_session"))
+        if session is None:
+            return Response({"detail": "Directory session not found or expired."}, status=status.HTTP_404_NOT_FOUND)
+
+        first_page = session.next_page
+        deadline = new_deadline(float(payload.get("budget_s") or SEARCH_BUDGET))
+        providers, cut_off = await run_on_agent_loop(session.fetch(int(payload.get("pages") or 1), deadline))
+        return Response({
+            "directory_session": payload["directory_session"],
+            "first_page": first_page,
+            "providers": providers,
+            "partial": cut_off or any(p.get("partial") for p in providers),
+            "has_more": session.has_more,
+        })
+
 
 class SearchResultViewSet(viewsets.ModelViewSet):
     queryset = SearchResult.objects.select_related("search", "provider").all().order_by("-id")